@@ -0,0 +1,78 @@
+import hashlib
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+
+GENERATION_KEY = 'generation:{}'
+STATS_KEY = 'response_cache:{}'
+
+
+def _new_generation():
+    # Поколение начинается со времени, чтобы после вытеснения счётчика
+    # из кэша не совпасть со старыми ключами ответов.
+    return time.time_ns()
+
+
+def bump_generation(label):
+    """
+    Увеличивает поколение модели, делая её кэшированные ответы старыми.
+    Внутри транзакции поколение меняется после её фиксации: иначе
+    чтение до фиксации сохранило бы старые данные под новым ключом.
+    """
+    transaction.on_commit(partial(_bump_generation, label))
+
+
+def _bump_generation(label):
+    key = GENERATION_KEY.format(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def get_generations(labels):
+    keys = [GENERATION_KEY.format(label) for label in labels]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def get_response_cache_key(view, request, labels):
+    """
+    Ключ ответа: представление, действие, аргументы url, нормализованная
+    строка запроса и поколения моделей, от которых зависит ответ.
+    """
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    generations = ':'.join(map(str, get_generations(labels)))
+    source = (
+        f'{request.get_host()}:{view.basename}:{view.action}:'
+        f'{sorted(view.kwargs.items())}:{query}:{generations}'
+    )
+    return f'response:{hashlib.md5(source.encode()).hexdigest()}'
+
+
+def record(event):
+    key = STATS_KEY.format(event)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_cache_stats():
+    """Возвращает счётчики попаданий и промахов кэша ответов."""
+    return {
+        event: cache.get(STATS_KEY.format(event), 0)
+        for event in ('hits', 'misses')
+    }
@@ -2,7 +2,10 @@ SHORT_LINK_PREFIX = 'www.olmazurova.ru/s/'
 PREFIX = 's'
 DOMAIN = 'www.olmazurova.ru/'
 PAGE_SIZE = 10
+FEED_CURSOR_ORDERING = ('-created', '-recipe_id')
 BASE_INT = 16
+AUTOCOMPLETE_LIMIT = 20
+MAX_AUTOCOMPLETE_LIMIT = 100
 RESPONSE_MESSAGES = {
     'is_favorited': {
         'error_add': 'Ошибка добавления в избранное',
@@ -15,3 +18,31 @@ RESPONSE_MESSAGES = {
         'detail': 'Рецепт успешно удалён из списка покупок',
     }
 }
+STREAM_CHUNK_BYTES = 64 * 1024
+ITERATOR_CHUNK_SIZE = 2000
+MAX_BATCH_RECIPES = 500
+MAX_IMPORT_RECIPES = 5000
+IMPORT_BATCH_SIZE = 500
+IMPORT_IMAGE_WORKERS = 8
+EXPORT_CHUNK_SIZE = 1000
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+IMAGE_MAX_PIXELS = 36_000_000
+IMAGE_RENDITIONS = {
+    'image': {'thumb': (480, 480), 'detail': (1200, 1200)},
+    'avatar': {'avatar': (160, 160)},
+}
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+RENDITIONS_DIR = 'renditions'
+CONTENT_HASH_PREFIX_LENGTH = 2
+SHOPPING_LIST_EXPORT_DIR = 'shopping_lists'
+SHOPPING_LIST_EXPORT_TTL_HOURS = 24
+PDF_PAGE_SIZE = (1240, 1754)
+PDF_RESOLUTION = 150
+PDF_MARGIN = 120
+PDF_FONT_SIZE = 28
+PDF_LINE_HEIGHT = 44
+PDF_LINE_CHARS = 60
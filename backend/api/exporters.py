@@ -0,0 +1,271 @@
+import csv
+import json
+import os
+import textwrap
+import zlib
+from collections import defaultdict
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from PIL import Image, ImageDraw, ImageFont
+
+from .constants import (CONTENT_HASH_PREFIX_LENGTH, EXPORT_CHUNK_SIZE,
+                        PDF_FONT_SIZE, PDF_LINE_CHARS, PDF_LINE_HEIGHT,
+                        PDF_MARGIN, PDF_PAGE_SIZE, PDF_RESOLUTION,
+                        SHOPPING_LIST_EXPORT_DIR, STREAM_CHUNK_BYTES)
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+SHOPPING_LIST_TITLE = 'Ваш список покупок:'
+SHOPPING_LIST_CSV_HEADER = ('name', 'measurement_unit', 'amount')
+
+
+def _txt_lines(rows):
+    yield SHOPPING_LIST_TITLE
+    for name, measurement_unit, amount in rows:
+        yield f'\n{name} - {amount} {measurement_unit}'
+
+
+def _flush(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def _csv_lines(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SHOPPING_LIST_CSV_HEADER)
+    yield _flush(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield _flush(buffer)
+
+
+def _json_lines(rows):
+    yield '['
+    separator = ''
+    for name, measurement_unit, amount in rows:
+        item = json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            },
+            ensure_ascii=False,
+        )
+        yield f'{separator}{item}'
+        separator = ', '
+    yield ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', _txt_lines),
+    'csv': ('text/csv; charset=utf-8', _csv_lines),
+    'json': ('application/json', _json_lines),
+}
+
+
+def _blocks(lines):
+    """Собирает строки в блоки байтов не больше STREAM_CHUNK_BYTES."""
+    chunk = []
+    size = 0
+    for line in lines:
+        encoded = line.encode('utf-8')
+        chunk.append(encoded)
+        size += len(encoded)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def iter_shopping_list(rows, export_format):
+    """
+    Построчно формирует список покупок в нужном формате и отдаёт его
+    блоками байтов не больше STREAM_CHUNK_BYTES.
+
+    rows - итерируемые кортежи (название, единица измерения, количество).
+    """
+    _, lines = SHOPPING_LIST_FORMATS[export_format]
+    return _blocks(lines(rows))
+
+
+def _write_csv(rows, file):
+    for chunk in iter_shopping_list(rows, 'csv'):
+        file.write(chunk)
+
+
+def _pdf_pages(rows):
+    """Рисует список покупок на страницах A4, по одной за раз."""
+    font = ImageFont.truetype(settings.SHOPPING_LIST_PDF_FONT, PDF_FONT_SIZE)
+    width, height = PDF_PAGE_SIZE
+    page = None
+    top = height
+    for line in _txt_lines(rows):
+        for part in textwrap.wrap(line.strip(), PDF_LINE_CHARS) or ['']:
+            if top + PDF_LINE_HEIGHT > height - PDF_MARGIN:
+                if page is not None:
+                    yield page
+                page = Image.new('L', PDF_PAGE_SIZE, 255)
+                draw = ImageDraw.Draw(page)
+                top = PDF_MARGIN
+            draw.text((PDF_MARGIN, top), part, font=font, fill=0)
+            top += PDF_LINE_HEIGHT
+    yield page
+
+
+def _write_pdf(rows, file):
+    """
+    Сохраняет список покупок в PDF. Страницы растровые: для кириллицы
+    нужен только шрифт из настроек. Каждая страница дописывается в файл
+    сразу после отрисовки, поэтому в памяти всегда не больше одной.
+    """
+    for number, page in enumerate(_pdf_pages(rows)):
+        page.save(
+            file,
+            format='PDF',
+            append=number > 0,
+            resolution=PDF_RESOLUTION,
+        )
+
+
+SHOPPING_LIST_EXPORT_FORMATS = {
+    'pdf': ('application/pdf', _write_pdf),
+    'csv': ('text/csv; charset=utf-8', _write_csv),
+}
+
+
+def get_shopping_list_export_path(cart_hash, export_format):
+    return os.path.join(
+        settings.PRIVATE_MEDIA_ROOT,
+        SHOPPING_LIST_EXPORT_DIR,
+        cart_hash[:CONTENT_HASH_PREFIX_LENGTH],
+        f'{cart_hash}.{export_format}',
+    )
+
+
+def export_shopping_list(rows, export_format, path):
+    """
+    Сохраняет список покупок в файл path. Файл появляется целиком:
+    сначала пишется временный файл, затем переименовывается. Файл
+    открыт и на чтение: в PDF страницы дописываются по одной.
+    """
+    _, write = SHOPPING_LIST_EXPORT_FORMATS[export_format]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'w+b') as file:
+        write(rows, file)
+    os.replace(temporary_path, path)
+
+
+def iter_by_id(queryset, columns, after=0, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Отдаёт строки values() пачками по chunk_size в порядке id, начиная
+    со следующей за after. Каждая пачка - отдельный запрос с условием
+    id > последнего id прошлой пачки: без OFFSET и без кэша queryset,
+    поэтому в памяти всегда не больше одной пачки.
+    """
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=after).order_by('pk').values(
+                *columns
+            )[:chunk_size].iterator(chunk_size=chunk_size)
+        )
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]['id']
+
+
+def _recipe_records(after, chunk_size):
+    """
+    Рецепты с id тегов, ингредиентами в формате POST /api/recipes/,
+    id автора и путём к изображению в хранилище.
+    """
+    for chunk in iter_by_id(
+        Recipe.objects.all(),
+        ('id', 'author_id', 'name', 'image', 'text', 'cooking_time',
+         'created'),
+        after,
+        chunk_size,
+    ):
+        ids = [row['id'] for row in chunk]
+        tags = defaultdict(list)
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=ids
+        ).order_by('pk').values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].append(tag_id)
+        ingredients = defaultdict(list)
+        for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=ids
+        ).order_by('pk').values_list('recipe_id', 'ingredient_id', 'amount'):
+            ingredients[recipe_id].append(
+                dict(zip(('id', 'amount'), ingredient))
+            )
+        for row in chunk:
+            yield {
+                'id': row['id'],
+                'author': row['author_id'],
+                'name': row['name'],
+                'image': row['image'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'created': row['created'].isoformat(),
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+            }
+
+
+def _user_records(after, chunk_size):
+    """Пользователи без пароля и служебных полей."""
+    for chunk in iter_by_id(
+        User.objects.all(),
+        ('id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+         'date_joined'),
+        after,
+        chunk_size,
+    ):
+        for row in chunk:
+            row['avatar'] = row['avatar'] or None
+            row['date_joined'] = row['date_joined'].isoformat()
+            yield row
+
+
+EXPORT_DATASETS = {
+    'recipes': _recipe_records,
+    'users': _user_records,
+}
+
+
+def export_records(dataset, after=0, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Записи набора dataset в порядке id, начиная со следующей за after.
+    Выгрузку можно продолжить с id последней полученной записи.
+    """
+    return EXPORT_DATASETS[dataset](after, chunk_size)
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_ndjson(records, compress=False):
+    """
+    Отдаёт записи строками NDJSON блоками байтов не больше
+    STREAM_CHUNK_BYTES, при compress - сжатыми в поток gzip.
+    """
+    blocks = _blocks(
+        f'{json.dumps(record, ensure_ascii=False)}\n' for record in records
+    )
+    return _gzip(blocks) if compress else blocks
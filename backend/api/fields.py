@@ -1,25 +1,141 @@
 import base64
+import posixpath
 
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.utils import timezone
+from django.core.files.uploadedfile import UploadedFile
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from api.constants import (IMAGE_FORMATS, IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS,
+                           IMAGE_RENDITIONS)
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
 
     def to_internal_value(self, data):
-        user = self.context['request'].user
-        if self.context['request'].method == 'PUT':
-            name = f'{user}.'
-        elif self.context['request'].method == 'POST':
-            name = f'{user}-{timezone.now()}.'
-        else:
-            recipe_id = self.context['request'].path.split('/')[-2]
-            name = f'{user}-{recipe_id}.'
+        # Хранилище заменит имя хешем содержимого, важно только расширение.
+        name = f'{self.field_name}.'
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
+            # Размер проверяется до декодирования всей строки.
+            if len(imgstr) * 3 // 4 > IMAGE_MAX_BYTES:
+                self.fail('too_large', max_bytes=IMAGE_MAX_BYTES)
             file_extension = format.split('/')[-1]
             data = ContentFile(
                 base64.b64decode(imgstr), name=name + file_extension
             )
+        elif isinstance(data, UploadedFile):
+            # Файл из multipart или тела запроса уже лежит во временном
+            # файле и не перечитывается.
+            file_extension = (
+                posixpath.splitext(data.name)[1].lstrip('.')
+                or data.content_type.split('/')[-1]
+            )
+            data.name = name + file_extension
+        if getattr(data, 'size', 0) > IMAGE_MAX_BYTES:
+            self.fail('too_large', max_bytes=IMAGE_MAX_BYTES)
+        image = super().to_internal_value(data)
+        width, height = image.image.size
+        if width * height > IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', max_pixels=IMAGE_MAX_PIXELS)
+        return image
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    URL уменьшенных копий изображения в форматах webp и jpeg.
+    Пока копии не созданы, вместо них отдаётся URL оригинала.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_url(self, file, name):
+        url = file.storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, instance):
+        file = getattr(instance, self.image_field)
+        if not file:
+            return None
+        ready = getattr(instance, f'{self.image_field}_variants')
+        return {
+            variant: {
+                image_format: self.get_url(
+                    file, ready.get(variant, {}).get(image_format, file.name)
+                )
+                for image_format in IMAGE_FORMATS
+            }
+            for variant in IMAGE_RENDITIONS[self.image_field]
+        }
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который после load() берёт объекты из
+    словаря, загруженного одним запросом IN, а не делает get() на
+    каждый id. Ошибки для неизвестных и неверных id те же.
+    """
+
+    def __init__(self, **kwargs):
+        self.loaded = {}
+        self.checked = set()
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def get_pk(self, data):
+        """id из data в виде ключа модели или None, если он неверный."""
+        if isinstance(data, bool):
+            return None
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except ValidationError:
+            return None
+
+    def load(self, values):
+        """
+        Загружает объекты по верным id из values одним запросом.
+        Уже проверенные id повторно не запрашиваются.
+        """
+        pks = {
+            pk for pk in map(self.get_pk, values) if pk is not None
+        } - self.checked
+        if pks:
+            self.loaded.update(self.get_queryset().in_bulk(pks))
+            self.checked |= pks
+
+    def to_internal_value(self, data):
+        pk = self.get_pk(data)
+        if pk not in self.checked:
+            # Без load() и для неверных id - проверка PrimaryKeyRelatedField.
+            return super().to_internal_value(data)
+        if pk not in self.loaded:
+            self.fail('does_not_exist', pk_value=data)
+        return self.loaded[pk]
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список id, объекты по которому загружаются одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child_relation.load(data)
         return super().to_internal_value(data)
@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from api.cache import bump_generation
+from api.constants import IMPORT_BATCH_SIZE, IMPORT_IMAGE_WORKERS
+from api.renditions import schedule_many_renditions
+from api.serializers import RecipeImageSerializer, RecipeImportSerializer
+from api.signals import recipes_created
+from recipes.models import Recipe, RecipeIngredient, StoredFile
+
+
+def store_image(data):
+    """
+    Проверяет изображение в base64 и сохраняет его в хранилище.
+    Возвращает пару (имя файла, None) или (None, ошибки поля image).
+    """
+    serializer = RecipeImageSerializer(data={'image': data})
+    if not serializer.is_valid():
+        return None, serializer.errors
+    image = serializer.validated_data['image']
+    field = Recipe._meta.get_field('image')
+    return field.storage.save(
+        field.generate_filename(None, image.name), image
+    ), None
+
+
+def create_recipes(author, recipes_data):
+    """
+    Создаёт рецепты с тегами и ингредиентами через bulk_create.
+    bulk_create не вызывает сигналы, поэтому их работу для всей пачки
+    выполняет recipes_created, а копии изображений и поколение кэша
+    ингредиентов рецептов - эта функция.
+    """
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=attrs['name'],
+            image=attrs['image'],
+            text=attrs['text'],
+            cooking_time=attrs['cooking_time'],
+        )
+        for attrs in recipes_data
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredient['ingredient'],
+            amount=ingredient['amount'],
+        )
+        for recipe, attrs in zip(recipes, recipes_data)
+        for ingredient in attrs['recipeingredient_set']
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe, attrs in zip(recipes, recipes_data)
+        for tag in attrs['tags']
+    )
+    recipes_created(recipes)
+    schedule_many_renditions(recipes, 'image')
+    bump_generation(RecipeIngredient._meta.model_name)
+    return recipes
+
+
+def release_images(names):
+    """
+    Удаляет изображения, сохранённые для пачки, транзакция которой
+    откатилась. Хранилище отдаёт одинаковым изображениям один файл,
+    поэтому файлы, на которые уже ссылаются другие объекты, остаются.
+    """
+    referenced = set(StoredFile.objects.filter(
+        name__in=names, references__gt=0
+    ).values_list('name', flat=True))
+    referenced.update(
+        Recipe.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    storage = Recipe._meta.get_field('image').storage
+    for name in set(names) - referenced:
+        storage.delete(name)
+
+
+def import_batch(batch, author, executor):
+    """Импортирует пачку строк в одной транзакции, возвращает отчёт."""
+    serializer = RecipeImportSerializer()
+    serializer.preload(data for _, data in batch)
+    report = {}
+    valid = []
+    for row, data in batch:
+        try:
+            valid.append((row, serializer.run_validation(data)))
+        except ValidationError as error:
+            report[row] = {'row': row, 'errors': error.detail}
+    images = executor.map(store_image, [attrs['image'] for _, attrs in valid])
+    stored = []
+    try:
+        for (row, attrs), (name, errors) in zip(valid, images):
+            if errors:
+                report[row] = {'row': row, 'errors': errors}
+            else:
+                attrs['image'] = name
+                stored.append((row, attrs))
+        if stored:
+            with transaction.atomic():
+                recipes = create_recipes(
+                    author, [attrs for _, attrs in stored]
+                )
+            for (row, _), recipe in zip(stored, recipes):
+                report[row] = {'row': row, 'id': recipe.pk}
+    except Exception:
+        release_images([attrs['image'] for _, attrs in stored])
+        raise
+    return [report[row] for row, _ in batch]
+
+
+def import_recipes(rows, author, batch_size=IMPORT_BATCH_SIZE,
+                   workers=IMPORT_IMAGE_WORKERS):
+    """
+    Импортирует рецепты автора author. rows - пары (номер строки,
+    данные рецепта в формате POST /api/recipes/). Строки читаются
+    пачками по batch_size: теги и ингредиенты пачки проверяются двумя
+    запросами, изображения декодируются и сохраняются в workers потоках,
+    а рецепты пачки добавляются в одной транзакции.
+
+    Отдаёт по записи отчёта на строку: {'row', 'id'} для созданного
+    рецепта или {'row', 'errors'} для отклонённого.
+    """
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            yield from import_batch(batch, author, executor)
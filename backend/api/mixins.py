@@ -1,6 +1,19 @@
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .cache import get_response_cache_key, record
+from .constants import RESPONSE_CACHE_TIMEOUT
+from .utils import get_requested_fields
+
 
 class GetUserMixin:
     """Добавляет метод get_user, возвращающий user из request."""
@@ -25,3 +38,155 @@ class NonePaginationPermissionMixin(AllowAnyPermissionsMixin):
     """Убирает пагинацию."""
 
     pagination_class = None
+
+
+class ResponseCacheMixin:
+    """
+    Кэширует ответы list и retrieve для анонимных пользователей.
+
+    В ключ входят поколения моделей из cache_models, которые сигналы
+    увеличивают при любом изменении этих моделей.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = get_response_cache_key(self, request, self.cache_models)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 на условные GET-запросы list и retrieve без сериализации.
+
+    get_list_validators и get_object_validators возвращают кортеж значений,
+    от которых зависит ответ: из него строится ETag. Last-Modified
+    отправляется, только если кортеж состоит из одних дат: удаления
+    и поколения кэша в списках не сдвигают самую позднюю дату, и
+    If-Modified-Since вернул бы 304 с устаревшим ответом. None отключает
+    проверку.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            self.get_list_validators, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            self.get_object_validators,
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def get_list_validators(self):
+        return None
+
+    def get_object_validators(self):
+        return None
+
+    def get_conditional_response(self, get_validators, handler, request,
+                                 *args, **kwargs):
+        validators = get_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        user = request.user
+        user_updated = getattr(user, 'updated', None)
+        last_modified = None
+        if validators and all(
+            isinstance(value, datetime) for value in validators
+        ):
+            last_modified = int(max(
+                value for value in (*validators, user_updated) if value
+            ).timestamp())
+        validators = (*validators, user.pk, user_updated)
+        source = (
+            f'{request.get_full_path()}:{request.accepted_renderer.format}:'
+            f'{validators}'
+        )
+        etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class SparseFieldsMixin:
+    """
+    Убирает из сериализатора поля, не выбранные параметрами fields
+    и omit. Действует только на сериализатор верхнего уровня:
+    вложенные сериализаторы создаются без запроса в контексте.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        requested = get_requested_fields(request, self.fields)
+        for field_name in list(self.fields):
+            if field_name not in requested:
+                self.fields.pop(field_name)
+
+
+class ReaderMixin:
+    """
+    list и retrieve без сериализаторов: ответ собирает объект
+    из get_reader() по строкам values() того же queryset.
+    """
+
+    def get_reader(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        queryset = reader.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+        return Response(reader.represent(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            reader.get_queryset(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        return Response(reader.represent([row])[0])
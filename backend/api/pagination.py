@@ -1,4 +1,15 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from .constants import PAGE_SIZE
 
@@ -9,3 +20,195 @@ class CustomPagination(PageNumberPagination):
     page_query_param = 'page'
     page_size_query_param = 'limit'
     max_page_size = PAGE_SIZE
+
+
+class MergedValues:
+    """
+    Несколько querysets values() с общими столбцами как один список
+    для KeysetPagination и Paginator. Сортировка, фильтр курсора и срез
+    применяются к каждому queryset отдельно, чтобы каждый читался по
+    своему индексу, а страница собирается слиянием уже обрезанных строк.
+    Все поля сортировки должны иметь одно направление.
+    """
+
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = ordering
+
+    @property
+    def model(self):
+        return self.querysets[0].model
+
+    @property
+    def query(self):
+        return self.querysets[0].query
+
+    def order_by(self, *ordering):
+        return MergedValues(
+            *(queryset.order_by(*ordering) for queryset in self.querysets),
+            ordering=ordering,
+        )
+
+    def filter(self, *args, **kwargs):
+        return MergedValues(
+            *(queryset.filter(*args, **kwargs) for queryset in self.querysets),
+            ordering=self.ordering,
+        )
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('MergedValues поддерживает только срезы.')
+        names = [field.lstrip('-') for field in self.ordering]
+        rows = sorted(
+            (
+                row for queryset in self.querysets
+                for row in queryset[:index.stop]
+            ),
+            key=lambda row: [row[name] for name in names],
+            reverse=self.ordering[0].startswith('-'),
+        )
+        return rows[index]
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Постраничная пагинация с дополнительным режимом курсора.
+
+    Запрос с параметром cursor (пустым для первой страницы) выбирает
+    записи по ключу из полей cursor_ordering представления без COUNT
+    и OFFSET и возвращает непрозрачные курсоры next и previous.
+    Без параметра cursor работает прежний режим page/limit.
+    """
+
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-created', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.ordering = getattr(
+            view, 'cursor_ordering', self.cursor_ordering
+        )
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(
+                ordering, self.parse_position(queryset, position)
+            ))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.results = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(reverse=False),
+            'previous': self.get_cursor_link(reverse=True),
+            'results': data,
+        })
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def parse_position(self, queryset, position):
+        """
+        Приводит значения из курсора к типам полей модели или
+        аннотаций queryset. Неприводимое значение - неверный курсор.
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            try:
+                model_field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                model_field = queryset.query.annotations[name].output_field
+            try:
+                value = model_field.to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    @staticmethod
+    def get_keyset_filter(ordering, values):
+        """Условие (a, b) < (x, y) с учётом направления каждого поля."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): values[number]
+                for number, previous in enumerate(ordering[:index])
+            }
+            equal[f'{field.lstrip("-")}__{lookup}'] = values[index]
+            conditions.append(Q(**equal))
+        return reduce(or_, conditions)
+
+    def get_position(self, obj):
+        position = []
+        for field in self.ordering:
+            # Страница - экземпляры моделей или строки values().
+            if isinstance(obj, dict):
+                value = obj[field.lstrip('-')]
+            else:
+                value = getattr(obj, field.lstrip('-'))
+            position.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        return position
+
+    def get_cursor_link(self, reverse):
+        has_link = self.has_previous if reverse else self.has_next
+        if not has_link or not self.results:
+            return None
+        obj = self.results[0] if reverse else self.results[-1]
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.get_position(obj), reverse),
+        )
+
+    @staticmethod
+    def encode_cursor(position, reverse):
+        data = json.dumps({'p': position, 'r': reverse}).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = data['p'], bool(data['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
@@ -0,0 +1,60 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles, FileUploadParser
+
+from api.constants import IMAGE_MAX_BYTES
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Тело запроса - само изображение с Content-Type: image/*.
+    Файл кладётся в поле upload_field_name представления; HttpRequest
+    его не закрывает, поэтому представления читают его в closing_uploads.
+    """
+
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        meta = parser_context['request'].META
+        try:
+            content_length = int(meta.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > IMAGE_MAX_BYTES:
+            raise ParseError(
+                f'Размер изображения больше {IMAGE_MAX_BYTES} байт.'
+            )
+        data_and_files = super().parse(stream, media_type, parser_context)
+        field_name = getattr(
+            parser_context['view'], 'upload_field_name', 'file'
+        )
+        return DataAndFiles({}, {field_name: data_and_files.files['file']})
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        return 'upload.' + media_type.split(';')[0].split('/')[-1].strip()
+
+
+class NDJSONParser(BaseParser):
+    """Тело запроса - объекты JSON по одному в строке, пустые пропускаются."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        rows = []
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line.decode(encoding)))
+            except (UnicodeDecodeError, ValueError) as error:
+                raise ParseError(f'Строка {number}: неверный JSON - {error}')
+        return rows
@@ -0,0 +1,279 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from api.constants import IMAGE_FORMATS, IMAGE_RENDITIONS
+from api.serializers import (AdvancedUserSerializer, RecipeSerializer,
+                             SubscriptionUserSerializer)
+from recipes.models import Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+class ImageURLs:
+    """URL изображения и его копий как у полей сериализаторов."""
+
+    def __init__(self, model, field_name, request):
+        self.storage = model._meta.get_field(field_name).storage
+        self.variants = tuple(IMAGE_RENDITIONS[field_name])
+        self.absolute = (
+            str if request is None else request.build_absolute_uri
+        )
+
+    def url(self, name):
+        if not name:
+            return None
+        return self.absolute(self.storage.url(name))
+
+    def variant_urls(self, name, ready):
+        if not name:
+            return None
+        return {
+            variant: {
+                image_format: self.url(
+                    ready.get(variant, {}).get(image_format, name)
+                )
+                for image_format in IMAGE_FORMATS
+            }
+            for variant in self.variants
+        }
+
+
+class Reader:
+    """
+    Собирает ответ list и retrieve из строк values() без экземпляров
+    моделей и полей DRF; JSON совпадает с ответом serializer_class.
+
+    Для каждого поля из fields задаются столбцы values() и функция,
+    получающая значение поля из строки. Функции выбираются один раз
+    в __init__ в порядке полей сериализатора.
+    """
+
+    serializer_class = None
+    # Столбцы, которые нужны всегда: первичный ключ и ключ курсора.
+    columns = ('id',)
+
+    def __init__(self, request, fields=None):
+        self.request = request
+        self.fields = [
+            name for name in self.serializer_class.Meta.fields
+            if fields is None or name in fields
+        ]
+        columns = self.get_columns()
+        accessors = self.get_accessors()
+        self.values = list(dict.fromkeys((
+            *self.columns,
+            *(column for name in self.fields for column in columns[name]),
+        )))
+        self.accessors = tuple(
+            (name, accessors[name]) for name in self.fields
+        )
+
+    def get_columns(self):
+        """Столбцы values() для каждого поля."""
+        raise NotImplementedError
+
+    def get_accessors(self):
+        """Функции, получающие значение каждого поля из строки."""
+        raise NotImplementedError
+
+    def load_related(self, rows):
+        """Загружает связанные объекты строк до построения ответа."""
+
+    def get_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*self.values)
+
+    def represent(self, rows):
+        rows = list(rows)
+        self.load_related(rows)
+        accessors = self.accessors
+        return [
+            {name: get(row) for name, get in accessors} for row in rows
+        ]
+
+
+class RecipeReader(Reader):
+    """Рецепты в формате RecipeSerializer."""
+
+    serializer_class = RecipeSerializer
+    columns = ('id', 'created')
+    author_columns = {
+        'email': 'author__email',
+        'id': 'author_id',
+        'username': 'author__username',
+        'first_name': 'author__first_name',
+        'last_name': 'author__last_name',
+        'is_subscribed': 'author_is_subscribed',
+        'avatar': 'author__avatar',
+        'avatar_variants': 'author__avatar_variants',
+    }
+
+    def __init__(self, request, fields=None):
+        self.images = ImageURLs(Recipe, 'image', request)
+        self.avatars = ImageURLs(User, 'avatar', request)
+        self.tags = self.ingredients = {}
+        super().__init__(request, fields)
+
+    def get_columns(self):
+        return {
+            'id': (),
+            'tags': (),
+            'author': tuple(
+                self.author_columns[name]
+                for name in AdvancedUserSerializer.Meta.fields
+            ),
+            'ingredients': (),
+            'is_favorited': ('user_favorited',),
+            'is_in_shopping_cart': ('user_in_shopping_cart',),
+            'name': ('name',),
+            'image': ('image',),
+            'image_variants': ('image', 'image_variants'),
+            'text': ('text',),
+            'cooking_time': ('cooking_time',),
+        }
+
+    def get_accessors(self):
+        author = get_user_accessor(
+            self.avatars,
+            {
+                name: self.author_columns[name]
+                for name in AdvancedUserSerializer.Meta.fields
+            },
+        )
+        url = self.images.url
+        variant_urls = self.images.variant_urls
+        return {
+            'id': itemgetter('id'),
+            'tags': lambda row: self.tags.get(row['id'], []),
+            'author': author,
+            'ingredients': lambda row: self.ingredients.get(row['id'], []),
+            'is_favorited': itemgetter('user_favorited'),
+            'is_in_shopping_cart': itemgetter('user_in_shopping_cart'),
+            'name': itemgetter('name'),
+            'image': lambda row: url(row['image']),
+            'image_variants': lambda row: variant_urls(
+                row['image'], row['image_variants']
+            ),
+            'text': itemgetter('text'),
+            'cooking_time': itemgetter('cooking_time'),
+        }
+
+    def load_related(self, rows):
+        """Теги и ингредиенты страницы - по одному запросу, как prefetch."""
+        ids = [row['id'] for row in rows]
+        if 'tags' in self.fields:
+            self.tags = defaultdict(list)
+            for recipe_id, *tag in Tag.objects.filter(
+                recipes__in=ids
+            ).values_list('recipes', 'id', 'name', 'slug'):
+                self.tags[recipe_id].append(
+                    dict(zip(('id', 'name', 'slug'), tag))
+                )
+        if 'ingredients' in self.fields:
+            self.ingredients = defaultdict(list)
+            for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+                recipe__in=ids
+            ).values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount',
+            ):
+                self.ingredients[recipe_id].append(dict(zip(
+                    ('id', 'name', 'measurement_unit', 'amount'), ingredient
+                )))
+
+
+class SubscriptionReader(Reader):
+    """Авторы из подписок в формате SubscriptionUserSerializer."""
+
+    serializer_class = SubscriptionUserSerializer
+    columns = ('id', 'subscription_id')
+
+    def __init__(self, request, fields=None, recipes_limit=None):
+        self.recipes_limit = recipes_limit
+        self.images = ImageURLs(Recipe, 'image', request)
+        self.avatars = ImageURLs(User, 'avatar', request)
+        self.recipes = {}
+        super().__init__(request, fields)
+
+    def get_columns(self):
+        return {
+            'email': ('email',),
+            'id': (),
+            'username': ('username',),
+            'first_name': ('first_name',),
+            'last_name': ('last_name',),
+            'is_subscribed': ('is_subscribed',),
+            'recipes': (),
+            'recipes_count': ('recipes_count',),
+            'avatar': ('avatar',),
+        }
+
+    def get_accessors(self):
+        avatar_url = self.avatars.url
+        return {
+            'email': itemgetter('email'),
+            'id': itemgetter('id'),
+            'username': itemgetter('username'),
+            'first_name': itemgetter('first_name'),
+            'last_name': itemgetter('last_name'),
+            'is_subscribed': itemgetter('is_subscribed'),
+            'recipes': lambda row: self.recipes.get(row['id'], []),
+            'recipes_count': itemgetter('recipes_count'),
+            'avatar': lambda row: avatar_url(row['avatar']),
+        }
+
+    def load_related(self, rows):
+        """
+        Последние рецепты авторов страницы одним запросом с той же
+        оконной функцией, что и в annotate_subscriptions.
+        """
+        if 'recipes' not in self.fields or not self.recipes_limit:
+            return
+        url = self.images.url
+        variant_urls = self.images.variant_urls
+        self.recipes = defaultdict(list)
+        for author_id, *recipe in Recipe.objects.filter(
+            author__in=[row['id'] for row in rows]
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=F('created').desc(),
+            )
+        ).filter(
+            position__lte=self.recipes_limit
+        ).order_by('-created').values_list(
+            'author_id', 'id', 'name', 'image', 'image_variants',
+            'cooking_time',
+        ):
+            pk, name, image, image_variants, cooking_time = recipe
+            self.recipes[author_id].append({
+                'id': pk,
+                'name': name,
+                'image': url(image),
+                'image_variants': variant_urls(image, image_variants),
+                'cooking_time': cooking_time,
+            })
+
+
+def get_user_accessor(avatars, columns):
+    """
+    Возвращает функцию, собирающую пользователя в формате
+    AdvancedUserSerializer из столбцов columns строки.
+    """
+    getters = {
+        name: itemgetter(column) for name, column in columns.items()
+    }
+    getters['avatar'] = lambda row: avatars.url(row[columns['avatar']])
+    getters['avatar_variants'] = lambda row: avatars.variant_urls(
+        row[columns['avatar']], row[columns['avatar_variants']]
+    )
+    getters = tuple(getters.items())
+
+    def get_user(row):
+        return {name: get(row) for name, get in getters}
+
+    return get_user
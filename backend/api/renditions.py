@@ -0,0 +1,96 @@
+import os
+import posixpath
+
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from api.cache import bump_generation
+from api.constants import IMAGE_FORMATS, IMAGE_RENDITIONS, RENDITIONS_DIR
+from jobs.queue import enqueue_many
+
+
+def get_rendition_name(name, variant, image_format):
+    """Имя копии рядом с оригиналом: recipes/3f/renditions/<хеш>-thumb.webp."""
+    directory, file_name = posixpath.split(name)
+    stem = posixpath.splitext(file_name)[0]
+    return posixpath.join(
+        directory, RENDITIONS_DIR, f'{stem}-{variant}.{image_format}'
+    )
+
+
+def render_variants(source_path, targets):
+    """
+    Сохраняет уменьшенные копии изображения. Выполняется обработчиком
+    очереди, targets - список (путь, (ширина, высота), формат).
+    """
+    # Имена копий производны от хеша оригинала: готовые копии
+    # одинаковых изображений не пересоздаются.
+    targets = [target for target in targets if not os.path.exists(target[0])]
+    if not targets:
+        return
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        for path, size, image_format in targets:
+            pil_format, options = IMAGE_FORMATS[image_format]
+            copy = image.copy()
+            copy.thumbnail(size)
+            if image_format == 'jpeg' and copy.mode not in ('RGB', 'L'):
+                copy = copy.convert('RGB')
+            elif copy.mode not in ('RGB', 'RGBA', 'L'):
+                copy = copy.convert('RGBA')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f'{path}.{os.getpid()}.tmp'
+            copy.save(temporary_path, format=pil_format, **options)
+            os.replace(temporary_path, path)
+
+
+def save_variants(model, pk, field_name, name, variants):
+    """Записывает готовые копии, если изображение не успели заменить."""
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+        **{f'{field_name}_variants': variants, 'updated': timezone.now()}
+    )
+    if updated:
+        bump_generation(model._meta.model_name)
+
+
+def _plan(file, field_name):
+    variants = {}
+    targets = []
+    for variant, size in IMAGE_RENDITIONS[field_name].items():
+        variants[variant] = {}
+        for image_format in IMAGE_FORMATS:
+            name = get_rendition_name(file.name, variant, image_format)
+            variants[variant][image_format] = name
+            targets.append((file.storage.path(name), size, image_format))
+    return variants, targets
+
+
+def render_now(instance, field_name):
+    """Создаёт копии изображения в текущем процессе."""
+    file = getattr(instance, field_name)
+    variants, targets = _plan(file, field_name)
+    render_variants(file.path, targets)
+    save_variants(type(instance), instance.pk, field_name, file.name, variants)
+
+
+def schedule_renditions(instance, field_name):
+    """
+    Ставит в очередь задачу на создание копий изображения.
+    До готовности копий сериализаторы отдают URL оригинала.
+    """
+    schedule_many_renditions([instance], field_name)
+
+
+def schedule_many_renditions(instances, field_name):
+    """Ставит в очередь задачи копий изображений объектов одним INSERT."""
+    payloads = [
+        {
+            'model': instance._meta.label,
+            'pk': instance.pk,
+            'field_name': field_name,
+            'name': getattr(instance, field_name).name,
+        }
+        for instance in instances if getattr(instance, field_name)
+    ]
+    if payloads:
+        enqueue_many('render_image_variants', payloads)
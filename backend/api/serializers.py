@@ -1,9 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 
-from api.constants import PAGE_SIZE
-from api.fields import Base64ImageField
-from api.utils import available_subscription, bulk_create_ingredients_and_tags
+from api.constants import MAX_BATCH_RECIPES
+from api.exporters import SHOPPING_LIST_EXPORT_FORMATS
+from api.fields import (Base64ImageField, BulkPrimaryKeyRelatedField,
+                        ImageVariantsField)
+from api.mixins import SparseFieldsMixin
+from api.renditions import schedule_renditions
+from api.utils import (annotate_recipes, available_subscription,
+                       bulk_create_ingredients_and_tags, get_recipes_limit,
+                       update_ingredients_and_tags)
+from jobs.models import Job
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 
 User = get_user_model()
@@ -18,20 +26,23 @@ class AvatarSerializer(serializers.Serializer):
         fields = ('avatar',)
 
 
-class AdvancedUserSerializer(serializers.ModelSerializer):
+class AdvancedUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели User."""
 
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField('avatar')
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'avatar'
+            'last_name', 'is_subscribed', 'avatar', 'avatar_variants'
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_authenticated:
             return available_subscription(user, obj)
@@ -73,13 +84,24 @@ class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Загружает все ингредиенты списка одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].load(
+                item.get('id') for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиентов."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
         source='ingredient',
     )
@@ -93,9 +115,10 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = RecipeIngredientListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор рецептов."""
 
     id = serializers.IntegerField(read_only=True)
@@ -107,21 +130,31 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField('image')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time',
+            'name', 'image', 'image_variants', 'text', 'cooking_time',
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'user_favorited'):
+            return obj.user_favorited
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.is_favorited.filter(id=user.id).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'user_in_shopping_cart'):
+            return obj.user_in_shopping_cart
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.is_in_shopping_cart.filter(id=user.id).exists())
@@ -133,7 +166,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         many=True, source='recipeingredient_set', required=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True, required=True,
     )
     image = Base64ImageField(required=True)  # в patch запросе необязателен
@@ -153,19 +186,33 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         bulk_create_ingredients_and_tags(
             recipe=recipe, ingredients_data=ingredients_data, tags=tags
         )
+        schedule_renditions(recipe, 'image')
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients_data = validated_data.pop('recipeingredient_set', [])
-        bulk_create_ingredients_and_tags(
+        update_ingredients_and_tags(
             recipe=instance, ingredients_data=ingredients_data, tags=tags
         )
+        if 'image' in validated_data:
+            instance.image_variants = {}
         instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_renditions(instance, 'image')
         return instance
 
     def to_representation(self, instance):
-        return RecipeSerializer(instance, context=self.context).data
+        """
+        Перечитывает рецепт через annotate_recipes: связанные данные
+        загружаются одним набором запросов при любом числе ингредиентов.
+        """
+        recipe = annotate_recipes(
+            Recipe.objects.filter(pk=instance.pk),
+            self.context.get('request').user,
+        ).get()
+        return RecipeSerializer(recipe, context=self.context).data
 
     def validate_image(self, value):
         request = self.context.get('request')
@@ -206,12 +253,58 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class RecipeImportSerializer(RecipeCreateSerializer):
+    """
+    Рецепт из импорта. Изображение проверяется и сохраняется отдельно,
+    в пуле потоков, поэтому здесь это строка base64.
+    """
+
+    image = serializers.CharField()
+
+    def validate_image(self, value):
+        return value
+
+    def preload(self, rows):
+        """Загружает теги и ингредиенты всех рецептов пачки двумя запросами."""
+        rows = [row for row in rows if isinstance(row, dict)]
+        self.fields['tags'].child_relation.load(
+            tag for row in rows if isinstance(row.get('tags'), list)
+            for tag in row['tags']
+        )
+        self.fields['ingredients'].child.fields['id'].load(
+            ingredient.get('id') for row in rows
+            if isinstance(row.get('ingredients'), list)
+            for ingredient in row['ingredients']
+            if isinstance(ingredient, dict)
+        )
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Сериализатор замены изображения рецепта."""
+
+    image = Base64ImageField()
+    image_variants = ImageVariantsField('image')
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'image_variants')
+        read_only_fields = ('id',)
+
+    def update(self, instance, validated_data):
+        instance.image_variants = {}
+        instance = super().update(instance, validated_data)
+        schedule_renditions(instance, 'image')
+        return instance
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для раздела 'избранное' и корзины покупок."""
 
+    image_variants = ImageVariantsField('image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
     def validate(self, attrs):
         user = self.context.get('request').user
@@ -233,7 +326,7 @@ class SubscriptionUserSerializer(AdvancedUserSerializer):
     """Сериализатор подписки."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -242,19 +335,48 @@ class SubscriptionUserSerializer(AdvancedUserSerializer):
             'is_subscribed', 'recipes', 'recipes_count', 'avatar'
         )
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_queryset = Recipe.objects.filter(author=obj)
-        recipes_limit = request.query_params.get('recipes_limit')
-        try:
-            limit = int(recipes_limit)
-        except (TypeError, ValueError):
-            limit = PAGE_SIZE
-
-        recipes_queryset = recipes_queryset[:limit]
+        if hasattr(obj, 'recipes_preview'):
+            recipes_queryset = obj.recipes_preview
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes_queryset = Recipe.objects.filter(author=obj)[:limit]
         return ShortRecipeSerializer(
             recipes_queryset, many=True, context=self.context
         ).data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор состояния фоновой задачи."""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'result', 'created',
+            'finished'
+        )
+
+
+class ShoppingListExportSerializer(serializers.Serializer):
+    """Параметры фоновой выгрузки списка покупок."""
+
+    format = serializers.ChoiceField(
+        choices=list(SHOPPING_LIST_EXPORT_FORMATS), default='pdf'
+    )
+
+
+class ExportSerializer(serializers.Serializer):
+    """Параметры выгрузки NDJSON: id, после которого продолжить, и сжатие."""
+
+    after = serializers.IntegerField(min_value=0, default=0)
+    gzip = serializers.BooleanField(default=False)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_RECIPES,
+    )
@@ -0,0 +1,444 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.utils import timezone
+
+from api.cache import bump_generation
+from jobs.queue import enqueue_many
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem, StoredFile, Subscription, Tag,
+                            TimelineEntry, recipe_amounts, recipes_amounts)
+
+User = get_user_model()
+
+CACHED_MODELS = (Recipe, Tag, Ingredient, RecipeIngredient, User)
+RECIPE_COUNTERS = {
+    Recipe.is_favorited.through: 'favorites_count',
+    Recipe.is_in_shopping_cart.through: 'in_carts_count',
+}
+FILE_FIELDS = {Recipe: 'image', User: 'avatar'}
+USER_COUNTERS = {
+    Recipe: ('author_id', 'recipes_count'),
+    Subscription: ('following_id', 'followers_count'),
+}
+
+
+def touch(model, pks):
+    """Обновляет поле updated у объектов, не вызывая их сохранения."""
+    model.objects.filter(pk__in=pks).update(updated=timezone.now())
+
+
+def shift_counter(model, pks, field_name, delta):
+    """Сдвигает счётчик на delta одним UPDATE, не опуская его ниже нуля."""
+    if delta:
+        model.objects.filter(pk__in=pks).update(
+            **{field_name: Greatest(F(field_name) + delta, 0)}
+        )
+
+
+def recipes_created(recipes):
+    """
+    Учитывает новые рецепты: счётчики рецептов авторов, ссылки на
+    изображения, ленты подписчиков и поколение кэша рецептов.
+    Вызывается сигналом post_save и импортом, который создаёт рецепты
+    через bulk_create без сигналов.
+    """
+    authors = Counter(recipe.author_id for recipe in recipes)
+    for author_id, count in authors.items():
+        shift_counter(User, [author_id], 'recipes_count', count)
+    StoredFile.objects.acquire_many(recipe.image.name for recipe in recipes)
+    enqueue_many(
+        'fan_out_recipe', [{'recipe_id': recipe.pk} for recipe in recipes]
+    )
+    bump_generation(Recipe._meta.model_name)
+
+
+def is_recipe_created(sender, created, raw):
+    return sender is Recipe and created and not raw
+
+
+def bump_model_generation(sender, update_fields=None, created=False,
+                          raw=False, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if is_recipe_created(sender, created, raw):
+        return
+    bump_generation(sender._meta.model_name)
+
+
+def bump_recipe_generation(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_generation(Recipe._meta.model_name)
+
+
+def get_linked_pks(sender, instance, action, pk_set, own, other):
+    """
+    pk объектов на другой стороне связи, затронутых действием
+    m2m_changed, или None до изменения. При clear pk_set пуст, поэтому
+    связи запоминаются в pre_clear. own и other - поля модели sender,
+    ссылающиеся на instance и на другую сторону.
+    """
+    if action == 'pre_clear':
+        instance.__dict__.setdefault('_cleared_links', {})[sender] = list(
+            sender.objects.filter(**{own: instance.pk}).values_list(
+                other, flat=True
+            )
+        )
+    elif action == 'post_clear':
+        return instance.__dict__.get('_cleared_links', {}).pop(sender, [])
+    elif action in ('post_add', 'post_remove'):
+        return pk_set
+    return None
+
+
+def touch_recipe_on_tags_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if reverse:
+        recipe_ids = get_linked_pks(
+            sender, instance, action, pk_set, 'tag', 'recipe'
+        )
+        if recipe_ids is not None:
+            touch(Recipe, recipe_ids)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        touch(Recipe, [instance.pk])
+
+
+def touch_recipe_on_ingredients_change(sender, instance, **kwargs):
+    touch(Recipe, [instance.recipe_id])
+
+
+def touch_user_on_recipes_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Избранное и корзина видны в ответах API их владельцу."""
+    if not reverse:
+        user_ids = get_linked_pks(
+            sender, instance, action, pk_set, 'recipe', 'user'
+        )
+        if user_ids is not None:
+            touch(User, user_ids)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        touch(User, [instance.pk])
+
+
+def touch_user_on_subscription_change(sender, instance, **kwargs):
+    touch(User, [instance.user_id])
+
+
+def count_recipe_users(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Ведёт счётчики избранного и списков покупок рецептов. При удалении
+    связи считаются до выполнения DELETE, чтобы не учесть отсутствующие.
+    """
+    field_name = RECIPE_COUNTERS[sender]
+    if action == 'post_add' and reverse:
+        shift_counter(Recipe, pk_set, field_name, 1)
+    elif action == 'post_add':
+        shift_counter(Recipe, [instance.pk], field_name, len(pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(
+            **{'user' if reverse else 'recipe': instance.pk}
+        )
+        if action == 'pre_remove':
+            links = links.filter(
+                **{'recipe__in' if reverse else 'user__in': pk_set}
+            )
+        if reverse:
+            shift_counter(Recipe, links.values('recipe'), field_name, -1)
+        else:
+            shift_counter(Recipe, [instance.pk], field_name, -links.count())
+
+
+def negate(amounts):
+    return {
+        ingredient_id: -amount for ingredient_id, amount in amounts.items()
+    }
+
+
+def cart_users(recipe_id):
+    return Recipe.is_in_shopping_cart.through.objects.filter(
+        recipe=recipe_id
+    ).values_list('user', flat=True)
+
+
+def update_shopping_lists_on_cart_change(sender, instance, action, reverse,
+                                         pk_set, **kwargs):
+    """
+    Переносит изменение корзины в списки покупок. Как и в
+    count_recipe_users, удаляемые связи читаются до DELETE.
+    """
+    apply_amounts = ShoppingListItem.objects.apply_amounts
+    if action == 'post_add' and reverse:
+        apply_amounts([instance.pk], recipes_amounts(pk_set))
+    elif action == 'post_add':
+        apply_amounts(pk_set, recipe_amounts(instance))
+    elif action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(
+            **{'user' if reverse else 'recipe': instance.pk}
+        )
+        if action == 'pre_remove':
+            links = links.filter(
+                **{'recipe__in' if reverse else 'user__in': pk_set}
+            )
+        if reverse:
+            apply_amounts(
+                [instance.pk], negate(recipes_amounts(links.values('recipe')))
+            )
+        else:
+            apply_amounts(
+                links.values_list('user', flat=True),
+                negate(recipe_amounts(instance)),
+            )
+
+
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    """Вычитает удаляемый рецепт из списков покупок целиком."""
+    ShoppingListItem.objects.remove_recipe_from_all(instance)
+
+
+def remember_recipe_ingredient(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние ингредиент и количество строки рецепта."""
+    if raw or instance.pk is None:
+        return
+    instance._previous_amount = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('ingredient_id', 'amount').first()
+
+
+def update_shopping_lists_on_ingredient_save(sender, instance, raw=False,
+                                             **kwargs):
+    """Переносит добавление или изменение ингредиента рецепта."""
+    if raw:
+        return
+    deltas = defaultdict(int)
+    previous = instance.__dict__.pop('_previous_amount', None)
+    if previous is not None:
+        ingredient_id, amount = previous
+        deltas[ingredient_id] -= amount
+    deltas[instance.ingredient_id] += instance.amount
+    ShoppingListItem.objects.apply_amounts(
+        cart_users(instance.recipe_id), deltas
+    )
+
+
+def update_shopping_lists_on_ingredient_delete(sender, instance, origin=None,
+                                               **kwargs):
+    """
+    Вычитает удаляемый ингредиент рецепта из списков покупок.
+
+    При удалении рецептов или их автора строки удаляются каскадом, а
+    рецепт целиком вычитает remove_recipe_from_shopping_lists. Строки,
+    удаляемые одним queryset, вычитаются вместе при первом сигнале.
+    """
+    origin_model = (
+        origin.model if isinstance(origin, QuerySet) else type(origin)
+    )
+    if origin_model in (Recipe, User):
+        return
+    if origin_model is RecipeIngredient and isinstance(origin, QuerySet):
+        if getattr(origin, '_shopping_lists_updated', False):
+            return
+        origin._shopping_lists_updated = True
+        rows = origin.values_list('recipe_id', 'ingredient_id', 'amount')
+    else:
+        rows = [(instance.recipe_id, instance.ingredient_id, instance.amount)]
+    deltas = defaultdict(lambda: defaultdict(int))
+    for recipe_id, ingredient_id, amount in rows:
+        deltas[recipe_id][ingredient_id] -= amount
+    for recipe_id, amounts in deltas.items():
+        ShoppingListItem.objects.apply_amounts(
+            cart_users(recipe_id), amounts
+        )
+
+
+def count_user_objects(sender, instance, signal, created=False, raw=False,
+                       **kwargs):
+    """
+    Ведёт счётчики рецептов и подписчиков пользователя. Созданные
+    рецепты учитывает recipes_created.
+    """
+    if raw or not (created or signal is post_delete):
+        return
+    if is_recipe_created(sender, created, raw):
+        return
+    attname, field_name = USER_COUNTERS[sender]
+    shift_counter(
+        User,
+        [getattr(instance, attname)],
+        field_name,
+        -1 if signal is post_delete else 1,
+    )
+
+
+def uncount_deleted_user(sender, instance, **kwargs):
+    """Каскадное удаление связей пользователя не вызывает m2m_changed."""
+    for through, field_name in RECIPE_COUNTERS.items():
+        shift_counter(
+            Recipe,
+            through.objects.filter(user=instance.pk).values('recipe'),
+            field_name,
+            -1,
+        )
+
+
+def remember_stored_file(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    """Запоминает прежний файл объекта перед сохранением."""
+    field_name = FILE_FIELDS[sender]
+    if raw or (update_fields is not None and field_name not in update_fields):
+        return
+    instance._previous_file = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(field_name, flat=True).first() if instance.pk else None
+
+
+def count_stored_file(sender, instance, created=False, raw=False,
+                      **kwargs):
+    """Переносит ссылку с прежнего файла объекта на новый."""
+    if not hasattr(instance, '_previous_file'):
+        return
+    previous = instance.__dict__.pop('_previous_file')
+    if is_recipe_created(sender, created, raw):
+        return
+    current = getattr(instance, FILE_FIELDS[sender]).name
+    if current != previous:
+        StoredFile.objects.acquire(current)
+        StoredFile.objects.release(previous)
+
+
+def release_stored_file(sender, instance, **kwargs):
+    StoredFile.objects.release(getattr(instance, FILE_FIELDS[sender]).name)
+
+
+def count_created_recipe(sender, instance, created=False, raw=False,
+                         **kwargs):
+    """Общие для API и импорта действия при создании рецепта."""
+    if is_recipe_created(sender, created, raw):
+        recipes_created([instance])
+
+
+def update_timeline(sender, instance, signal, created=False, raw=False,
+                    **kwargs):
+    """Заполняет ленту подписчика при подписке и очищает при отписке."""
+    if raw:
+        return
+    if signal is post_delete:
+        TimelineEntry.objects.prune(instance.user_id, instance.following_id)
+    elif created:
+        TimelineEntry.objects.backfill(
+            instance.user_id, instance.following_id
+        )
+
+
+for model in CACHED_MODELS:
+    post_save.connect(
+        bump_model_generation,
+        sender=model,
+        dispatch_uid=f'bump_{model._meta.model_name}_on_save',
+    )
+    post_delete.connect(
+        bump_model_generation,
+        sender=model,
+        dispatch_uid=f'bump_{model._meta.model_name}_on_delete',
+    )
+
+m2m_changed.connect(
+    bump_recipe_generation,
+    sender=Recipe.tags.through,
+    dispatch_uid='bump_recipe_on_tags_change',
+)
+m2m_changed.connect(
+    touch_recipe_on_tags_change,
+    sender=Recipe.tags.through,
+    dispatch_uid='touch_recipe_on_tags_change',
+)
+for name, signal in (('save', post_save), ('delete', post_delete)):
+    signal.connect(
+        touch_recipe_on_ingredients_change,
+        sender=RecipeIngredient,
+        dispatch_uid=f'touch_recipe_on_ingredient_{name}',
+    )
+    signal.connect(
+        touch_user_on_subscription_change,
+        sender=Subscription,
+        dispatch_uid=f'touch_user_on_subscription_{name}',
+    )
+for through in (
+    Recipe.is_favorited.through, Recipe.is_in_shopping_cart.through
+):
+    m2m_changed.connect(
+        touch_user_on_recipes_change,
+        sender=through,
+        dispatch_uid=f'touch_user_on_{through._meta.model_name}_change',
+    )
+    m2m_changed.connect(
+        count_recipe_users,
+        sender=through,
+        dispatch_uid=f'count_{through._meta.model_name}',
+    )
+for model in USER_COUNTERS:
+    for name, signal in (('save', post_save), ('delete', post_delete)):
+        signal.connect(
+            count_user_objects,
+            sender=model,
+            dispatch_uid=f'count_user_{model._meta.model_name}_on_{name}',
+        )
+m2m_changed.connect(
+    update_shopping_lists_on_cart_change,
+    sender=Recipe.is_in_shopping_cart.through,
+    dispatch_uid='update_shopping_lists_on_cart_change',
+)
+pre_delete.connect(
+    remove_recipe_from_shopping_lists,
+    sender=Recipe,
+    dispatch_uid='remove_recipe_from_shopping_lists',
+)
+pre_save.connect(
+    remember_recipe_ingredient,
+    sender=RecipeIngredient,
+    dispatch_uid='remember_recipe_ingredient',
+)
+post_save.connect(
+    update_shopping_lists_on_ingredient_save,
+    sender=RecipeIngredient,
+    dispatch_uid='update_shopping_lists_on_ingredient_save',
+)
+pre_delete.connect(
+    update_shopping_lists_on_ingredient_delete,
+    sender=RecipeIngredient,
+    dispatch_uid='update_shopping_lists_on_ingredient_delete',
+)
+pre_delete.connect(
+    uncount_deleted_user,
+    sender=User,
+    dispatch_uid='uncount_deleted_user',
+)
+for model in FILE_FIELDS:
+    name = model._meta.model_name
+    pre_save.connect(
+        remember_stored_file,
+        sender=model,
+        dispatch_uid=f'remember_{name}_stored_file',
+    )
+    post_save.connect(
+        count_stored_file, sender=model, dispatch_uid=f'count_{name}_file'
+    )
+    post_delete.connect(
+        release_stored_file,
+        sender=model,
+        dispatch_uid=f'release_{name}_stored_file',
+    )
+post_save.connect(
+    count_created_recipe,
+    sender=Recipe,
+    dispatch_uid='count_created_recipe',
+)
+for name, signal in (('save', post_save), ('delete', post_delete)):
+    signal.connect(
+        update_timeline,
+        sender=Subscription,
+        dispatch_uid=f'update_timeline_on_subscription_{name}',
+    )
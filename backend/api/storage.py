@@ -0,0 +1,42 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from api.constants import CONTENT_HASH_PREFIX_LENGTH
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранит файлы под именем, равным хешу содержимого:
+    recipes/3f/3fa9...e1.jpg. Одинаковые файлы записываются один раз,
+    а файл по однажды выданному URL никогда не меняется.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        directory, file_name = posixpath.split(name)
+        extension = posixpath.splitext(file_name)[1].lower()
+        return posixpath.join(
+            directory,
+            content_hash[:CONTENT_HASH_PREFIX_LENGTH],
+            f'{content_hash}{extension}',
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения защищает файл от сборщика мусора,
+            # пока новая ссылка на него не сохранена в БД.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,46 @@
+import os
+
+from django.apps import apps
+
+from api.exporters import export_shopping_list, get_shopping_list_export_path
+from api.renditions import render_now
+from api.utils import get_shopping_cart_hash, get_shopping_list_rows
+from jobs.queue import task
+from recipes.models import Recipe, TimelineEntry
+
+
+@task('render_image_variants')
+def render_image_variants(model, pk, field_name, name):
+    """Создаёт копии изображения, если его не успели заменить."""
+    instance = apps.get_model(model).objects.filter(
+        pk=pk, **{field_name: name}
+    ).only('pk', field_name).first()
+    if instance is not None:
+        render_now(instance, field_name)
+
+
+@task('export_shopping_list')
+def export_shopping_list_file(user_id, export_format):
+    """
+    Сохраняет список покупок пользователя в файл, общий для всех
+    одинаковых корзин. Готовый файл повторно не создаётся, только
+    продлевается срок его хранения.
+    """
+    rows = list(get_shopping_list_rows(user_id))
+    cart_hash = get_shopping_cart_hash(rows)
+    path = get_shopping_list_export_path(cart_hash, export_format)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        export_shopping_list(rows, export_format, path)
+    return {'cart_hash': cart_hash, 'format': export_format}
+
+
+@task('fan_out_recipe')
+def fan_out_recipe(recipe_id):
+    """Добавляет рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'pk', 'author', 'created'
+    ).first()
+    if recipe is not None:
+        TimelineEntry.objects.fan_out(recipe)
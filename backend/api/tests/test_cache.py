@@ -0,0 +1,38 @@
+from django.db import transaction
+
+from api.cache import get_generations
+from api.tests.utils import FoodgramTestCase
+
+
+class CacheGenerationTest(FoodgramTestCase):
+    """Поколения моделей меняются только после фиксации транзакции."""
+
+    def test_bump_after_commit(self):
+        recipe = self.recipes[0]
+        [generation] = get_generations(['recipe'])
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                recipe.name = 'Новое название'
+                recipe.save()
+                self.assertEqual(get_generations(['recipe']), [generation])
+        self.assertNotEqual(get_generations(['recipe']), [generation])
+
+    def test_anonymous_response_after_update(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        self.assertEqual(self.client.get(url).data['cooking_time'], 10)
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                url,
+                {
+                    'ingredients': [
+                        {'id': self.ingredients[0].pk, 'amount': 1},
+                    ],
+                    'tags': [self.tags[0].pk],
+                    'cooking_time': 25,
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).data['cooking_time'], 25)
@@ -0,0 +1,50 @@
+from django.utils.http import http_date
+
+from api.tests.utils import FoodgramTestCase
+
+
+class ConditionalGetTest(FoodgramTestCase):
+    """Условные GET не отдают 304 с устаревшим списком."""
+
+    def test_list_after_delete(self):
+        url = '/api/recipes/'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[-1].delete()
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': etag},
+            {'HTTP_IF_MODIFIED_SINCE': http_date()},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.data['count'], self.recipes_count - 1
+                )
+
+    def test_recipe_after_tag_rename(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        tag = self.tags[0]
+        tag.name = 'Новое имя'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tags'][0]['name'], 'Новое имя')
+
+    def test_user_last_modified(self):
+        url = f'/api/users/{self.author.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            ).status_code,
+            304,
+        )
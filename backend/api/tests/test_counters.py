@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+
+from api.tests.utils import FoodgramTestCase
+from recipes.models import Recipe, Subscription
+
+User = get_user_model()
+
+
+class CounterSaveTest(FoodgramTestCase):
+    """Сохранение устаревшего объекта не затирает счётчики."""
+
+    def test_stale_recipe(self):
+        stale = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.recipes[0].is_favorited.add(self.user)
+        self.recipes[0].is_in_shopping_cart.add(self.user)
+        stale.name = 'Новое название'
+        stale.save()
+        recipe = Recipe.objects.get(pk=stale.pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.in_carts_count, 1)
+
+    def test_stale_user(self):
+        stale = User.objects.get(pk=self.author.pk)
+        Subscription.objects.create(user=self.user, following=self.author)
+        self.create_recipe(self.author, 'Ещё рецепт', self.tags[:1], {})
+        stale.first_name = 'Автор'
+        stale.save()
+        author = User.objects.get(pk=stale.pk)
+        self.assertEqual(author.first_name, 'Автор')
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.recipes_count, self.recipes_count + 1)
+
+    def test_stale_recipe_api(self):
+        stale = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            f'/api/recipes/{stale.pk}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        stale.save()
+        self.assertEqual(
+            Recipe.objects.get(pk=stale.pk).favorites_count, 1
+        )
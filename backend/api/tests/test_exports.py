@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from PIL import PdfParser
+
+from api.constants import PDF_LINE_HEIGHT, PDF_MARGIN, PDF_PAGE_SIZE
+from api.exporters import export_shopping_list, get_shopping_list_export_path
+
+
+class ShoppingListExportTest(SimpleTestCase):
+    """Выгрузки списков покупок в PRIVATE_MEDIA_ROOT."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = os.path.join(directory.name, 'media')
+        self.private_media_root = os.path.join(directory.name, 'private')
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            PRIVATE_MEDIA_ROOT=self.private_media_root,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def export(self, cart_hash, rows, export_format='pdf'):
+        path = get_shopping_list_export_path(cart_hash, export_format)
+        export_shopping_list(rows, export_format, path)
+        return path
+
+    def test_pdf_pages(self):
+        lines_per_page = (
+            (PDF_PAGE_SIZE[1] - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT
+        )
+        rows = [
+            (f'Ингредиент {number}', 'г', number)
+            for number in range(2 * lines_per_page)
+        ]
+        path = self.export('ab' * 20, rows)
+        self.assertEqual(len(PdfParser.PdfParser(path).pages), 3)
+        path = self.export('cd' * 20, rows[:1])
+        self.assertEqual(len(PdfParser.PdfParser(path).pages), 1)
+
+    def test_collect_expired(self):
+        rows = [('Ингредиент', 'г', 1)]
+        expired = self.export('ab' * 20, rows, 'csv')
+        fresh = self.export('cd' * 20, rows, 'csv')
+        touched = self.export('ef' * 20, rows, 'csv')
+        abandoned = f'{expired}.1.tmp'
+        open(abandoned, 'wb').close()
+        day_ago = time.time() - 25 * 60 * 60
+        for path in (expired, touched, abandoned):
+            os.utime(path, (day_ago, day_ago))
+        os.utime(touched)
+        call_command('collect_media_garbage', stdout=StringIO())
+        self.assertFalse(os.path.exists(expired))
+        self.assertFalse(os.path.exists(abandoned))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.exists(touched))
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+
+from api.tests.utils import FoodgramTestCase
+from recipes.constants import FEED_FANOUT_MAX_FOLLOWERS
+from recipes.models import Recipe, Subscription, TimelineEntry
+
+User = get_user_model()
+
+
+class FeedTest(FoodgramTestCase):
+    """Лента собирается из записей TimelineEntry и популярных авторов."""
+
+    url = '/api/recipes/feed/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.popular = cls.create_user('popular')
+        cls.stranger = cls.create_user('stranger')
+        for number, author in enumerate(
+            (cls.popular, cls.stranger, cls.popular)
+        ):
+            cls.create_recipe(
+                author, f'Рецепт автора {number}',
+                cls.tags[number:number + 1], {},
+            )
+        for author in (cls.author, cls.popular):
+            Subscription.objects.create(user=cls.user, following=author)
+        User.objects.filter(pk=cls.popular.pk).update(
+            followers_count=FEED_FANOUT_MAX_FOLLOWERS
+        )
+        cls.expected = list(Recipe.objects.filter(
+            author__in=(cls.author, cls.popular)
+        ).order_by('-created', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_pages(self):
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, recipe__author=self.popular
+        ).exists())
+        ids = []
+        for page in range(1, len(self.expected) // 3 + 2):
+            response = self.client.get(self.url, {'page': page, 'limit': 3})
+            self.assertEqual(response.data['count'], len(self.expected))
+            ids += self.get_ids(response)
+        self.assertEqual(ids, self.expected)
+
+    def test_cursor(self):
+        ids = []
+        response = self.client.get(self.url, {'cursor': '', 'limit': 3})
+        while True:
+            ids += self.get_ids(response)
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, self.expected)
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(self.get_ids(previous), self.expected[3:6])
+
+    def test_filter(self):
+        tag = self.tags[0]
+        response = self.client.get(self.url, {'tags': tag.slug})
+        self.assertEqual(self.get_ids(response), [
+            pk for pk in self.expected
+            if Recipe.objects.filter(pk=pk, tags=tag).exists()
+        ])
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import override_settings
+
+from api.importers import import_recipes
+from api.tests.utils import FoodgramTestCase
+from jobs.models import Job
+from recipes.models import Recipe, StoredFile
+
+
+class ImportRecipesTest(FoodgramTestCase):
+    """Импорт рецептов пачками через bulk_create."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def get_row(self, name, color):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': self.get_image(color),
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+        }
+
+    def import_rows(self, *rows):
+        return list(import_recipes(enumerate(rows, 1), self.author))
+
+    def assert_created(self, count):
+        self.author.refresh_from_db()
+        self.assertEqual(
+            self.author.recipes_count, self.recipes_count + count
+        )
+        self.assertEqual(
+            Job.objects.filter(name='fan_out_recipe').count(),
+            self.recipes_count + count,
+        )
+
+    def test_side_effects(self):
+        report = self.import_rows(
+            self.get_row('Первый', 'red'), self.get_row('Второй', 'blue')
+        )
+        self.assert_created(2)
+        images = list(Recipe.objects.filter(
+            pk__in=[row['id'] for row in report]
+        ).values_list('image', flat=True))
+        for name in images:
+            self.assertEqual(StoredFile.objects.get(name=name).references, 1)
+        Recipe.objects.create(
+            author=self.author,
+            name='Третий',
+            image=images[0],
+            text='Описание',
+            cooking_time=5,
+        )
+        self.assert_created(3)
+        self.assertEqual(
+            StoredFile.objects.get(name=images[0]).references, 2
+        )
+
+    def test_rollback_releases_images(self):
+        [kept] = self.import_rows(self.get_row('Первый', 'red'))
+        kept_name = Recipe.objects.get(pk=kept['id']).image.name
+        with mock.patch(
+            'api.importers.recipes_created', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.import_rows(
+                    self.get_row('Второй', 'red'),
+                    self.get_row('Третий', 'blue'),
+                )
+        self.assertEqual(Recipe.objects.filter(name='Третий').count(), 0)
+        self.assertTrue(self.storage.exists(kept_name))
+        self.assertEqual(
+            StoredFile.objects.get(name=kept_name).references, 1
+        )
+        self.assertEqual(
+            [
+                os.path.join(directory, name)
+                for directory, _, names in os.walk(self.storage.path(''))
+                for name in names
+            ],
+            [self.storage.path(kept_name)],
+        )
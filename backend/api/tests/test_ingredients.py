@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+
+class IngredientAutocompleteTest(APITestCase):
+    """Подсказки ингредиентов не зависят от регистра кириллицы."""
+
+    url = '/api/ingredients/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='Сок абрикоса', measurement_unit='мл')
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Абрикос', measurement_unit='г'),
+            Ingredient(name='Яблоко', measurement_unit='шт'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_names(self, query, **params):
+        response = self.client.get(self.url, {'name': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_first(self):
+        for query in ('абр', 'АБР', 'Абр'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.get_names(query), ['Абрикос', 'Сок абрикоса']
+                )
+
+    def test_limit(self):
+        self.assertEqual(self.get_names('абр', limit=1), ['Абрикос'])
+
+    def test_renamed(self):
+        ingredient = Ingredient.objects.get(name='Яблоко')
+        ingredient.name = 'Абрикосовый джем'
+        ingredient.save(update_fields=['name'])
+        self.assertEqual(
+            self.get_names('абрикос'),
+            ['Абрикос', 'Абрикосовый джем', 'Сок абрикоса'],
+        )
+
+    def test_fields(self):
+        ingredient = Ingredient.objects.get(name='Абрикос')
+        for url in (self.url, f'{self.url}{ingredient.pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                data = response.data
+                item = data[0] if isinstance(data, list) else data
+                self.assertEqual(
+                    set(item), {'id', 'name', 'measurement_unit'}
+                )
@@ -0,0 +1,53 @@
+from api.pagination import KeysetPagination
+from api.tests.utils import FoodgramTestCase
+from recipes.models import Subscription
+
+
+class KeysetPaginationTest(FoodgramTestCase):
+    """Курсоры с подменёнными значениями дают 404, а не ошибку сервера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for username in ('first', 'second', 'third'):
+            Subscription.objects.create(
+                user=cls.user, following=cls.create_user(username)
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, position, limit=1):
+        return self.client.get(url, {
+            'cursor': KeysetPagination.encode_cursor(position, False),
+            'limit': limit,
+        })
+
+    def test_subscriptions(self):
+        url = '/api/users/subscriptions/'
+        response = self.client.get(url, {'cursor': '', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [author['username'] for author in response.data['results']],
+            ['third', 'second'],
+        )
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(
+            [author['username'] for author in next_page.data['results']],
+            ['first'],
+        )
+        for value in ('abc', {}, [1], None, '1.5'):
+            with self.subTest(value=value):
+                self.assertEqual(
+                    self.get(url, [value]).status_code, 404
+                )
+
+    def test_recipes(self):
+        url = '/api/recipes/'
+        for position in (
+            ['abc', 1], [None, 1], ['2025-01-01T00:00:00', {}],
+            ['2025-01-01T00:00:00', None],
+        ):
+            with self.subTest(position=position):
+                self.assertEqual(self.get(url, position).status_code, 404)
@@ -0,0 +1,82 @@
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.utils import FoodgramTestCase
+from recipes.models import Ingredient
+
+# Запросы списка рецептов: валидаторы условного GET, COUNT пагинации,
+# страница рецептов, теги и ингредиенты страницы.
+RECIPE_LIST_QUERIES = 5
+
+
+class RecipeListQueriesTest(FoodgramTestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    url = '/api/recipes/'
+
+    def assert_list_queries(self):
+        for limit in (2, self.recipes_count):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.client.get(self.url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        self.assert_list_queries()
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries()
+
+
+class RecipeCreateQueriesTest(FoodgramTestCase):
+    """Число запросов создания рецепта не зависит от числа ингредиентов."""
+
+    url = '/api/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.author)
+
+    def create_recipe_queries(self, ingredients, color):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.url,
+                {
+                    'name': f'Рецепт из {len(ingredients)}',
+                    'text': 'Описание',
+                    'cooking_time': 5,
+                    'image': self.get_image(color),
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 1}
+                        for ingredient in ingredients
+                    ],
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            len(response.data['ingredients']), len(ingredients)
+        )
+        return len(queries)
+
+    def test_many_ingredients(self):
+        ingredients = self.ingredients + Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ещё ингредиент {number}', measurement_unit='г')
+            for number in range(24)
+        )
+        self.assertEqual(
+            self.create_recipe_queries(ingredients, 'red'),
+            self.create_recipe_queries(ingredients[:1], 'blue'),
+        )
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.readers import RecipeReader, SubscriptionReader
+from api.serializers import RecipeSerializer, SubscriptionUserSerializer
+from api.tests.utils import FoodgramTestCase
+from api.utils import (annotate_recipes, annotate_subscriptions,
+                       get_recipes_limit, get_requested_fields)
+from recipes.models import Recipe, Subscription
+
+User = get_user_model()
+
+
+class ReaderTest(FoodgramTestCase):
+    """Ответы читателей values() побайтно совпадают с сериализаторами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_author = cls.create_user('other')
+        cls.create_recipe(
+            cls.other_author, 'Чужой рецепт', cls.tags[:1],
+            {cls.ingredients[0]: 1},
+        )
+        now = timezone.now()
+        for number, recipe in enumerate(Recipe.objects.order_by('pk')):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                created=now - timedelta(minutes=number)
+            )
+        Recipe.objects.filter(pk=cls.recipes[2].pk).update(image_variants={
+            'thumb': {'webp': 'recipes/renditions/test-thumb.webp'},
+        })
+        User.objects.filter(pk=cls.author.pk).update(
+            avatar='users/author.png',
+            avatar_variants={
+                'avatar': {'jpeg': 'users/renditions/author-avatar.jpeg'},
+            },
+        )
+        cls.recipes[0].is_favorited.add(cls.user)
+        cls.recipes[1].is_in_shopping_cart.add(cls.user)
+        for author in (cls.author, cls.other_author):
+            Subscription.objects.create(user=cls.user, following=author)
+
+    def get_request(self, user, params):
+        request = Request(APIRequestFactory().get('/api/', params))
+        request.user = user
+        return request
+
+    def assert_same(self, serializer, reader, queryset):
+        self.assertEqual(
+            JSONRenderer().render(reader.represent(
+                reader.get_queryset(queryset)
+            )),
+            JSONRenderer().render(serializer.data),
+        )
+
+    def test_recipes(self):
+        for user in (self.user, AnonymousUser()):
+            for params in (
+                {}, {'fields': 'id,name,author,image'},
+                {'omit': 'ingredients,tags'},
+            ):
+                with self.subTest(user=user, params=params):
+                    request = self.get_request(user, params)
+                    fields = get_requested_fields(
+                        request, RecipeSerializer.Meta.fields
+                    )
+                    queryset = annotate_recipes(
+                        Recipe.objects.order_by('-created', '-id'),
+                        user,
+                        fields,
+                    )
+                    self.assert_same(
+                        RecipeSerializer(
+                            queryset, many=True, context={'request': request}
+                        ),
+                        RecipeReader(request, fields),
+                        queryset,
+                    )
+
+    def test_subscriptions(self):
+        for params in (
+            {}, {'recipes_limit': 2}, {'recipes_limit': 0},
+            {'fields': 'id,username,recipes'}, {'omit': 'recipes'},
+        ):
+            with self.subTest(params=params):
+                request = self.get_request(self.user, params)
+                fields = get_requested_fields(
+                    request, SubscriptionUserSerializer.Meta.fields
+                )
+                recipes_limit = get_recipes_limit(request)
+                queryset = annotate_subscriptions(
+                    User.objects.filter(followers__user=self.user).annotate(
+                        subscription_id=F('followers__id')
+                    ).order_by('-subscription_id'),
+                    recipes_limit,
+                    fields,
+                )
+                self.assert_same(
+                    SubscriptionUserSerializer(
+                        queryset, many=True, context={'request': request}
+                    ),
+                    SubscriptionReader(request, fields, recipes_limit),
+                    queryset,
+                )
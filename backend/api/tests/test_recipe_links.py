@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.db import connection
+
+from api.tests.utils import FoodgramTestCase
+from recipes.models import Recipe
+
+LINKS = {
+    'favorite': ('is_favorited', 'favorites_count'),
+    'shopping_cart': ('is_in_shopping_cart', 'in_carts_count'),
+}
+
+
+class RecipeLinksTest(FoodgramTestCase):
+    """
+    Ответ избранного и корзины выбирается по числу изменённых строк,
+    с RETURNING и без него.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def for_each_backend(self, test):
+        for path, (field_name, counter) in LINKS.items():
+            for returning in (True, False):
+                with self.subTest(path=path, returning=returning):
+                    with mock.patch.object(
+                        type(connection.features),
+                        'can_return_rows_from_bulk_insert',
+                        mock.PropertyMock(return_value=returning),
+                    ):
+                        test(path, field_name, counter)
+                    getattr(Recipe, field_name).through.objects.filter(
+                        user=self.user
+                    ).delete()
+                    Recipe.objects.update(favorites_count=0, in_carts_count=0)
+
+    def assert_linked(self, field_name, counter, recipe, linked):
+        recipe.refresh_from_db()
+        self.assertEqual(getattr(recipe, counter), int(linked))
+        self.assertEqual(
+            getattr(recipe, field_name).filter(pk=self.user.pk).exists(),
+            linked,
+        )
+
+    def test_single(self):
+        def test(path, field_name, counter):
+            recipe = self.recipes[0]
+            url = f'/api/recipes/{recipe.pk}/{path}/'
+            for method, code, linked in (
+                ('post', 201, True),
+                ('post', 400, True),
+                ('delete', 204, False),
+                ('delete', 400, False),
+            ):
+                response = getattr(self.client, method)(url)
+                self.assertEqual(response.status_code, code, method)
+                self.assert_linked(field_name, counter, recipe, linked)
+            self.assertEqual(response.data, {'errors': mock.ANY})
+            missing = Recipe.objects.order_by('pk').last().pk + 1
+            for method in ('post', 'delete'):
+                response = getattr(self.client, method)(
+                    f'/api/recipes/{missing}/{path}/'
+                )
+                self.assertEqual(response.status_code, 404, method)
+
+        self.for_each_backend(test)
+
+    def test_batch(self):
+        def test(path, field_name, counter):
+            first, second = self.recipes[:2]
+            url = f'/api/recipes/{path}/'
+            missing = Recipe.objects.order_by('pk').last().pk + 1
+            self.client.post(f'/api/recipes/{first.pk}/{path}/')
+            for method, ids, key, changed in (
+                ('post', [first.pk, second.pk, missing], 'added',
+                 [second.pk]),
+                ('post', [first.pk, second.pk], 'added', []),
+                ('delete', [first.pk, missing], 'removed', [first.pk]),
+                ('delete', [first.pk], 'removed', []),
+            ):
+                response = getattr(self.client, method)(
+                    url, {'ids': ids}, format='json'
+                )
+                self.assertEqual(response.status_code, 200, method)
+                self.assertEqual(response.data, {key: changed})
+            self.assert_linked(field_name, counter, first, False)
+            self.assert_linked(field_name, counter, second, True)
+
+        self.for_each_backend(test)
@@ -0,0 +1,71 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.utils import FoodgramTestCase
+from recipes.models import RecipeIngredient
+
+TABLE = RecipeIngredient._meta.db_table
+
+
+class RecipeUpdateTest(FoodgramTestCase):
+    """PATCH меняет только отличающиеся строки ингредиентов рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+        self.recipe = self.recipes[0]
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get_rows(self):
+        return dict(
+            RecipeIngredient.objects.filter(recipe=self.recipe).values_list(
+                'ingredient_id', 'pk'
+            )
+        )
+
+    def patch_ingredients(self, amounts):
+        """Возвращает изменяющие запросы к таблице ингредиентов рецепта."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                self.url,
+                {
+                    'tags': [tag.pk for tag in self.recipe.tags.all()],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': amount}
+                        for ingredient, amount in amounts.items()
+                    ],
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [
+            query['sql'].split(maxsplit=1)[0].upper()
+            for query in queries.captured_queries
+            if TABLE in query['sql']
+            and not query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def test_unchanged(self):
+        rows = self.get_rows()
+        amounts = {
+            row.ingredient: row.amount
+            for row in self.recipe.recipeingredient_set.select_related(
+                'ingredient'
+            )
+        }
+        self.assertEqual(self.patch_ingredients(amounts), [])
+        self.assertEqual(self.get_rows(), rows)
+
+    def test_changed(self):
+        rows = self.get_rows()
+        first, second, _ = self.ingredients[:3]
+        new = self.ingredients[5]
+        writes = self.patch_ingredients({first: 1, second: 100, new: 3})
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT', 'UPDATE'])
+        current = self.get_rows()
+        self.assertEqual(current[first.pk], rows[first.pk])
+        self.assertEqual(current[second.pk], rows[second.pk])
+        self.assertEqual(set(current), {first.pk, second.pk, new.pk})
+        self.assertEqual(
+            RecipeIngredient.objects.get(pk=current[second.pk]).amount, 100
+        )
@@ -0,0 +1,63 @@
+from api.tests.utils import FoodgramTestCase
+
+
+class DownloadShoppingCartTest(FoodgramTestCase):
+    """ETag выгрузки списка покупок меняется вместе с её содержимым."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[2]
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        return response, response.content
+
+    def assert_changed(self, etag, text):
+        response, content = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(text, content.decode())
+
+    def test_content_length(self):
+        response, content = self.download()
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn('Ингредиент', content.decode())
+
+    def test_not_modified(self):
+        response, _ = self.download()
+        response, _ = self.download(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_amounts_with_same_sums(self):
+        """
+        Количества трёх ингредиентов с подряд идущими id меняются на
+        +1, -2 и +1: число строк, сумма и взвешенная по id сумма
+        количеств остаются прежними.
+        """
+        response, _ = self.download()
+        self.client.force_authenticate(self.author)
+        self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': amount}
+                    for ingredient, amount in zip(
+                        self.ingredients[2:5], (4, 2, 6)
+                    )
+                ],
+                'tags': [tag.pk for tag in self.tags],
+            },
+            format='json',
+        )
+        self.client.force_authenticate(self.user)
+        self.assert_changed(response['ETag'], 'Ингредиент 3 - 2 г')
+
+    def test_ingredient_renamed(self):
+        response, _ = self.download()
+        self.ingredients[2].name = 'Мука'
+        self.ingredients[2].save()
+        self.assert_changed(response['ETag'], 'Мука - 3 г')
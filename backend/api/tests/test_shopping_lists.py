@@ -0,0 +1,87 @@
+from api.tests.utils import FoodgramTestCase
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem)
+
+
+class ShoppingListSignalsTest(FoodgramTestCase):
+    """Списки покупок следуют за изменениями корзин и рецептов в ORM."""
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other')
+        self.recipes[0].is_in_shopping_cart.add(self.user, self.other)
+        self.user.shopping_cart.add(self.recipes[1], self.recipes[2])
+        self.assert_consistent()
+
+    def assert_consistent(self):
+        """Таблица совпадает со списками, собранными заново по корзинам."""
+        self.assertEqual(
+            list(ShoppingListItem.objects.order_by(
+                'user', 'ingredient'
+            ).values_list('user', 'ingredient', 'total_amount')),
+            list(ShoppingListItem.objects.aggregate_carts()),
+        )
+
+    def test_cart_changes(self):
+        self.assertTrue(ShoppingListItem.objects.filter(user=self.other))
+        self.recipes[0].is_in_shopping_cart.remove(self.other, self.author)
+        self.assert_consistent()
+        self.user.shopping_cart.remove(self.recipes[1], self.recipes[3])
+        self.assert_consistent()
+        self.recipes[0].is_in_shopping_cart.set([self.author])
+        self.assert_consistent()
+        self.user.shopping_cart.clear()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.filter(user=self.user))
+
+    def test_recipe_ingredient_changes(self):
+        row = RecipeIngredient.objects.filter(recipe=self.recipes[0]).first()
+        row.amount += 5
+        row.save()
+        self.assert_consistent()
+        row.ingredient = self.ingredients[5]
+        row.save()
+        self.assert_consistent()
+        RecipeIngredient.objects.create(
+            recipe=self.recipes[0], ingredient=self.ingredients[4], amount=7
+        )
+        self.assert_consistent()
+        row.delete()
+        self.assert_consistent()
+        RecipeIngredient.objects.filter(recipe=self.recipes[1]).delete()
+        self.assert_consistent()
+
+    def test_deletions(self):
+        self.recipes[0].delete()
+        self.assert_consistent()
+        Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        self.assert_consistent()
+        Ingredient.objects.filter(pk=self.ingredients[3].pk).delete()
+        self.assert_consistent()
+        self.author.delete()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_api_update(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[0].pk}/',
+            {
+                'ingredients': [
+                    {'id': self.ingredients[0].pk, 'amount': 10},
+                    {'id': self.ingredients[4].pk, 'amount': 3},
+                ],
+                'tags': [self.tags[0].pk],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_consistent()
+        self.client.delete(f'/api/recipes/{self.recipes[1].pk}/')
+        self.assert_consistent()
+        self.client.force_authenticate(self.user)
+        self.client.delete(
+            f'/api/recipes/{self.recipes[2].pk}/shopping_cart/'
+        )
+        self.client.post(f'/api/recipes/{self.recipes[3].pk}/shopping_cart/')
+        self.assert_consistent()
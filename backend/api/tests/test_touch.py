@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from api.tests.utils import FoodgramTestCase
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class TouchOnClearTest(FoodgramTestCase):
+    """clear() связей обновляет updated у объектов на другой стороне."""
+
+    def setUp(self):
+        super().setUp()
+        self.past = timezone.now() - timedelta(days=1)
+
+    def get_touched(self, model):
+        model.objects.update(updated=self.past)
+
+        def touched():
+            return set(model.objects.filter(
+                updated__gt=self.past
+            ).values_list('pk', flat=True))
+        return touched
+
+    def test_recipe_users_clear(self):
+        other = self.create_user('other')
+        for field_name in ('is_favorited', 'is_in_shopping_cart'):
+            with self.subTest(field_name=field_name):
+                recipe = self.recipes[0]
+                getattr(recipe, field_name).add(self.user, other)
+                touched = self.get_touched(User)
+                getattr(recipe, field_name).clear()
+                self.assertEqual(touched(), {self.user.pk, other.pk})
+
+    def test_user_recipes_clear(self):
+        self.user.favorited_recipes.add(*self.recipes[:2])
+        touched = self.get_touched(User)
+        self.user.favorited_recipes.clear()
+        self.assertEqual(touched(), {self.user.pk})
+
+    def test_tag_recipes_clear(self):
+        tag = self.tags[2]
+        recipe_ids = set(tag.recipes.values_list('pk', flat=True))
+        self.assertTrue(recipe_ids)
+        touched = self.get_touched(Recipe)
+        tag.recipes.clear()
+        self.assertEqual(touched(), recipe_ids)
+
+    def test_recipe_tags_clear(self):
+        recipe = self.recipes[2]
+        touched = self.get_touched(Recipe)
+        recipe.tags.clear()
+        self.assertEqual(touched(), {recipe.pk})
@@ -0,0 +1,54 @@
+import base64
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import override_settings
+
+from api.tests.utils import FoodgramTestCase
+
+
+class ImageUploadTest(FoodgramTestCase):
+    """Изображение телом запроса с Content-Type: image/*."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.author)
+
+    def put_image(self, url):
+        """Возвращает ответ и временные файлы, созданные при загрузке."""
+        uploads = []
+        init = TemporaryUploadedFile.__init__
+
+        def track(upload, *args, **kwargs):
+            init(upload, *args, **kwargs)
+            uploads.append(upload)
+
+        body = base64.b64decode(self.get_image('red').split(',')[1])
+        with mock.patch.object(TemporaryUploadedFile, '__init__', track):
+            response = self.client.put(
+                url, body, content_type='image/png'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(uploads), 1)
+        self.assertTrue(uploads[0].file.closed)
+        return response
+
+    def test_avatar(self):
+        response = self.put_image('/api/users/me/avatar/')
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.avatar)
+        self.assertTrue(
+            response.data['avatar'].endswith(self.author.avatar.url)
+        )
+
+    def test_recipe_image(self):
+        recipe = self.recipes[0]
+        self.put_image(f'/api/recipes/{recipe.pk}/image/')
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, 'recipes/test.png')
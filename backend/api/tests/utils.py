@@ -0,0 +1,87 @@
+import base64
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+class FoodgramTestCase(APITestCase):
+    """Общие данные тестов: пользователи, теги, ингредиенты и рецепты."""
+
+    recipes_count = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.user = cls.create_user('user')
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(6)
+        ]
+        cls.recipes = [
+            cls.create_recipe(
+                cls.author,
+                name=f'Рецепт {number}',
+                tags=cls.tags[:number % 3 + 1],
+                ingredients={
+                    ingredient: number + index + 1
+                    for index, ingredient in enumerate(
+                        cls.ingredients[number % 3:number % 3 + 3]
+                    )
+                },
+            )
+            for number in range(cls.recipes_count)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            password='Password-12345',
+            first_name=username,
+            last_name=username,
+        )
+
+    @staticmethod
+    def create_recipe(author, name, tags, ingredients):
+        """ingredients - словарь {ингредиент: количество}."""
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            image='recipes/test.png',
+            text='Описание',
+            cooking_time=10,
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in ingredients.items()
+        )
+        return recipe
+
+    @staticmethod
+    def get_image(color):
+        """Изображение PNG в base64, как в запросах к API."""
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
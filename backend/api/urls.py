@@ -1,16 +1,20 @@
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import (AvatarView, IngredientViewSet, RecipeViewSet,
-                    SubscribeView, SubscriptionsView, TagViewSet)
+from .views import (AvatarView, CacheStatsView, IngredientViewSet, JobView,
+                    RecipeViewSet, SubscribeView, SubscriptionsView,
+                    TagViewSet, UserViewSet)
 
 router = DefaultRouter()
+router.register('users', UserViewSet)
 router.register('tags', TagViewSet)
 router.register('ingredients', IngredientViewSet)
 router.register('recipes', RecipeViewSet)
 
 
 urlpatterns = [
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('jobs/<int:pk>/', JobView.as_view(), name='job'),
     path('users/me/avatar/', AvatarView.as_view(), name='avatar'),
     path(
         'users/subscriptions/',
@@ -22,7 +26,6 @@ urlpatterns = [
         SubscribeView.as_view(),
         name='subscribe'
     ),
-    path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path('', include(router.urls)),
 ]
@@ -1,9 +1,327 @@
-from recipes.models import Recipe, RecipeIngredient, Subscription
+import hashlib
+from contextlib import contextmanager
 
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import BooleanField, Exists, F, OuterRef, Prefetch, Value
+from django.utils.http import quote_etag
+from rest_framework.permissions import SAFE_METHODS
 
-def get_recipes_filter_by_field_name(field_name, value):
-    filter_kwargs = {field_name: value}
-    return Recipe.objects.filter(**filter_kwargs)
+from api.constants import AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT, PAGE_SIZE
+from api.signals import RECIPE_COUNTERS, shift_counter, touch
+from recipes.constants import FEED_FANOUT_MAX_FOLLOWERS
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem, Subscription, TimelineEntry,
+                            recipes_amounts)
+
+User = get_user_model()
+
+# Поля сериализатора, которые читают аннотации annotate_recipes.
+RECIPE_FLAGS = {
+    'is_favorited': 'user_favorited',
+    'is_in_shopping_cart': 'user_in_shopping_cart',
+    'author': 'author_is_subscribed',
+}
+# Тяжёлые столбцы, которые не читаются, если их нет в ответе.
+RECIPE_DEFERRABLE_FIELDS = ('text', 'image_variants')
+
+
+@contextmanager
+def closing_uploads(request):
+    """
+    Отдаёт request.data и закрывает загруженные файлы на выходе:
+    HttpRequest сам закрывает только файлы из multipart/form-data.
+    """
+    data = request.data
+    try:
+        yield data
+    finally:
+        for upload in request.FILES.values():
+            upload.close()
+
+
+def get_requested_fields(request, field_names):
+    """
+    Оставляет из field_names поля, перечисленные через запятую
+    в параметре fields, и убирает поля из параметра omit. Ответы
+    на изменяющие запросы всегда содержат все поля.
+    """
+    requested = set(field_names)
+    if request is None or request.method not in SAFE_METHODS:
+        return requested
+    fields = request.query_params.get('fields')
+    if fields:
+        requested &= set(fields.split(','))
+    omit = request.query_params.get('omit')
+    if omit:
+        requested -= set(omit.split(','))
+    return requested
+
+
+def _apply_recipe_links(field_name, user, recipe_ids, sign):
+    """
+    Обновляет счётчики рецептов и список покупок после изменения связей.
+    Связи меняются запросами в обход m2m_changed, поэтому сигналы
+    здесь не срабатывают.
+    """
+    if not recipe_ids:
+        return
+    through = getattr(Recipe, field_name).through
+    shift_counter(Recipe, recipe_ids, RECIPE_COUNTERS[through], sign)
+    touch(User, [user.pk])
+    if field_name == 'is_in_shopping_cart':
+        ShoppingListItem.objects.apply_amounts([user.pk], {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in recipes_amounts(recipe_ids).items()
+        })
+
+
+def _get_link_columns(field_name):
+    """Таблица связей и её столбцы в кавычках для сырого SQL."""
+    through = getattr(Recipe, field_name).through
+    quote = connection.ops.quote_name
+    return (
+        through,
+        quote(through._meta.db_table),
+        quote(through._meta.get_field('recipe').column),
+        quote(through._meta.get_field('user').column),
+    )
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def link_recipes(field_name, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину пользователя одним
+    INSERT ... ON CONFLICT DO NOTHING RETURNING. Возвращает id
+    добавленных рецептов: уже добавленные и несуществующие пропускаются,
+    поэтому одновременные запросы не добавят рецепт дважды.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return []
+    through, table, recipe_column, user_column = _get_link_columns(
+        field_name
+    )
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            with connection.cursor() as cursor:
+                recipe_table = connection.ops.quote_name(Recipe._meta.db_table)
+                recipe_pk = connection.ops.quote_name(Recipe._meta.pk.column)
+                cursor.execute(
+                    f'INSERT INTO {table} ({recipe_column}, {user_column}) '
+                    f'SELECT {recipe_pk}, %s FROM {recipe_table} '
+                    f'WHERE {recipe_pk} IN ({_placeholders(recipe_ids)}) '
+                    f'ON CONFLICT DO NOTHING RETURNING {recipe_column}',
+                    [user.pk, *recipe_ids],
+                )
+                linked = [row[0] for row in cursor.fetchall()]
+        else:
+            list(User.objects.select_for_update().filter(
+                pk=user.pk
+            ).values_list('pk', flat=True))
+            linked = list(Recipe.objects.filter(pk__in=recipe_ids).exclude(
+                pk__in=through.objects.filter(user=user).values('recipe')
+            ).values_list('pk', flat=True))
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, user_id=user.pk)
+                for recipe_id in linked
+            )
+        _apply_recipe_links(field_name, user, linked, 1)
+    return linked
+
+
+def unlink_recipes(field_name, user, recipe_ids):
+    """
+    Убирает рецепты из избранного или корзины пользователя одним
+    DELETE ... RETURNING и возвращает id действительно удалённых.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return []
+    through, table, recipe_column, user_column = _get_link_columns(
+        field_name
+    )
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE {user_column} = %s '
+                    f'AND {recipe_column} IN ({_placeholders(recipe_ids)}) '
+                    f'RETURNING {recipe_column}',
+                    [user.pk, *recipe_ids],
+                )
+                unlinked = [row[0] for row in cursor.fetchall()]
+        else:
+            list(User.objects.select_for_update().filter(
+                pk=user.pk
+            ).values_list('pk', flat=True))
+            links = through.objects.filter(user=user, recipe__in=recipe_ids)
+            unlinked = list(links.values_list('recipe_id', flat=True))
+            links.delete()
+        _apply_recipe_links(field_name, user, unlinked, -1)
+    return unlinked
+
+
+def annotate_recipes(queryset, user, fields=None):
+    """
+    Подгружает связанные данные рецептов и аннотирует флаги пользователя,
+    чтобы число запросов не зависело от количества рецептов.
+
+    fields - поля RecipeSerializer в ответе: данные для остальных полей
+    не загружаются. None - все поля.
+    """
+    def wanted(field_name):
+        return fields is None or field_name in fields
+
+    if wanted('author'):
+        queryset = queryset.select_related('author')
+    if wanted('tags'):
+        queryset = queryset.prefetch_related('tags')
+    if wanted('ingredients'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        ))
+    deferred = [name for name in RECIPE_DEFERRABLE_FIELDS if not wanted(name)]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+    if user.is_authenticated:
+        flags = {
+            'user_favorited': Exists(
+                Recipe.is_favorited.through.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+            'user_in_shopping_cart': Exists(
+                Recipe.is_in_shopping_cart.through.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+            'author_is_subscribed': Exists(
+                Subscription.objects.filter(
+                    user=user, following=OuterRef('author')
+                )
+            ),
+        }
+    else:
+        false = Value(False, output_field=BooleanField())
+        flags = dict.fromkeys(RECIPE_FLAGS.values(), false)
+    return queryset.annotate(**{
+        name: flags[name]
+        for field_name, name in RECIPE_FLAGS.items() if wanted(field_name)
+    })
+
+
+def annotate_users(queryset, user, fields=None):
+    """Аннотирует подписку текущего пользователя, если она есть в ответе."""
+    if fields is not None and 'is_subscribed' not in fields:
+        return queryset
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user=user, following=OuterRef('pk'))
+    ))
+
+
+def get_feed_sources(user, recipes):
+    """
+    Источники ленты подписок для MergedValues, строки - created и
+    recipe_id. Записи TimelineEntry пользователя читаются по индексу
+    (user, -created). Рецепты популярных авторов не раскладываются по
+    лентам и читаются из recipes по подпискам, а их прежние записи в
+    ленте пропускаются, чтобы рецепт не попал на страницу дважды.
+
+    recipes - отфильтрованный queryset рецептов: без условий фильтр
+    к записям ленты не добавляется.
+    """
+    timeline = TimelineEntry.objects.filter(user=user)
+    if recipes.query.has_filters():
+        timeline = timeline.filter(recipe__in=recipes.values('pk'))
+    popular_authors = list(Subscription.objects.filter(
+        user=user, following__followers_count__gte=FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('following_id', flat=True))
+    if not popular_authors:
+        return [timeline.values('created', 'recipe_id')]
+    return [
+        timeline.exclude(
+            recipe__author__in=popular_authors
+        ).values('created', 'recipe_id'),
+        recipes.filter(author__in=popular_authors).values(
+            'created', recipe_id=F('pk')
+        ),
+    ]
+
+
+def get_recipes_limit(request):
+    """Возвращает число рецептов автора из параметра recipes_limit."""
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return limit if limit >= 0 else PAGE_SIZE
+
+
+def get_autocomplete_limit(request):
+    """Возвращает число подсказок из параметра limit."""
+    try:
+        limit = int(request.query_params.get('limit'))
+    except (TypeError, ValueError):
+        return AUTOCOMPLETE_LIMIT
+    return min(limit, MAX_AUTOCOMPLETE_LIMIT) if limit > 0 else (
+        AUTOCOMPLETE_LIMIT
+    )
+
+
+def autocomplete_ingredients(query, limit):
+    """
+    Подсказки ингредиентов: сначала названия, начинающиеся с query,
+    затем содержащие его. Регистр приводится в Python, поиск идёт по
+    столбцу name_lower с индексом ingredient_name_lower_idx, каждая
+    часть ограничена limit.
+    """
+    query = query.strip().lower()
+    ingredients = Ingredient.objects.all()
+    if connection.vendor == 'postgresql':
+        by_prefix = ingredients.filter(name_lower__startswith=query)
+    else:
+        by_prefix = ingredients.filter(
+            name_lower__gte=query, name_lower__lt=f'{query}\U0010ffff'
+        )
+    result = list(by_prefix.order_by('name_lower')[:limit])
+    if len(result) < limit:
+        result += ingredients.filter(name_lower__contains=query).exclude(
+            pk__in=[ingredient.pk for ingredient in result]
+        ).order_by('name_lower')[:limit - len(result)]
+    return result
+
+
+def annotate_subscriptions(queryset, recipes_limit, fields=None):
+    """
+    Подгружает последние рецепты авторов, число рецептов хранится
+    в поле recipes_count.
+
+    Срез в Prefetch выполняется одним запросом с оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY author ORDER BY created DESC)
+    для всех авторов страницы сразу. Без поля recipes в fields
+    рецепты не загружаются.
+    """
+    queryset = queryset.annotate(
+        is_subscribed=Value(True, output_field=BooleanField()),
+    )
+    if fields is not None and 'recipes' not in fields:
+        return queryset
+    return queryset.prefetch_related(
+        Prefetch(
+            'recipes',
+            queryset=Recipe.objects.order_by('-created')[:recipes_limit],
+            to_attr='recipes_preview',
+        )
+    )
 
 
 def available_subscription(user, following):
@@ -12,6 +330,37 @@ def available_subscription(user, following):
     ).exists()
 
 
+def get_shopping_list_rows(user):
+    """Возвращает ингредиенты из списка покупок пользователя."""
+    return ShoppingListItem.objects.filter(user=user).order_by(
+        'ingredient'
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    )
+
+
+def get_shopping_cart_etag(user, rows, export_format):
+    """
+    Вычисляет ETag списка покупок по его строкам rows: любое изменение
+    количества, названия или единицы измерения меняет ETag.
+    """
+    return quote_etag(
+        f'{user.pk}.{get_shopping_cart_hash(rows)}.{export_format}'
+    )
+
+
+def get_shopping_cart_hash(rows):
+    """
+    Хеш содержимого списка покупок, rows - строки get_shopping_list_rows.
+    Не зависит от пользователя: одинаковые корзины дают одинаковый хеш.
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update('\t'.join(map(str, row)).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
 def bulk_create_ingredients_and_tags(recipe, ingredients_data, tags):
     recipe.tags.set(tags)
     RecipeIngredient.objects.filter(recipe=recipe).delete()
@@ -24,3 +373,56 @@ def bulk_create_ingredients_and_tags(recipe, ingredients_data, tags):
         for ingredient in ingredients_data
     )
     return objs
+
+
+def update_ingredients_and_tags(recipe, ingredients_data, tags):
+    """
+    Приводит теги и ингредиенты рецепта к новым значениям, меняя
+    только отличающиеся строки: количества обновляются одним
+    bulk_update, новые ингредиенты добавляются, лишние удаляются.
+    Если ингредиенты не изменились, таблица не меняется.
+
+    bulk_update и bulk_create не вызывают сигналы, поэтому их изменения
+    переносятся в списки покупок здесь; удалённые строки вычитает
+    сигнал pre_delete.
+    """
+    recipe.tags.set(tags)
+    existing = {
+        row.ingredient_id: row
+        for row in RecipeIngredient.objects.filter(recipe=recipe).only(
+            'pk', 'ingredient_id', 'amount'
+        )
+    }
+    new_amounts = {
+        ingredient['ingredient'].id: ingredient['amount']
+        for ingredient in ingredients_data
+    }
+    changed = []
+    deltas = {}
+    for ingredient_id, amount in new_amounts.items():
+        row = existing.get(ingredient_id)
+        if row is None:
+            deltas[ingredient_id] = amount
+        elif row.amount != amount:
+            deltas[ingredient_id] = amount - row.amount
+            row.amount = amount
+            changed.append(row)
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+    removed = [
+        row.pk for ingredient_id, row in existing.items()
+        if ingredient_id not in new_amounts
+    ]
+    if removed:
+        RecipeIngredient.objects.filter(pk__in=removed).delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=ingredient_id, amount=amount
+        )
+        for ingredient_id, amount in new_amounts.items()
+        if ingredient_id not in existing
+    )
+    if deltas:
+        ShoppingListItem.objects.apply_amounts(
+            recipe.is_in_shopping_cart.values_list('pk', flat=True), deltas
+        )
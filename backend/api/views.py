@@ -1,47 +1,120 @@
+import os
+from functools import partial
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Count, F, Max
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, generics, status, viewsets
+from djoser.views import UserViewSet as DjoserUserViewSet
+from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.fields import ListField
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-
-from .constants import BASE_INT, DOMAIN, RESPONSE_MESSAGES, SHORT_LINK_PREFIX
+from rest_framework.views import APIView
+
+from .cache import get_cache_stats, get_generations
+from .constants import (BASE_INT, DOMAIN, FEED_CURSOR_ORDERING,
+                        ITERATOR_CHUNK_SIZE, MAX_IMPORT_RECIPES,
+                        RESPONSE_MESSAGES, SHORT_LINK_PREFIX)
+from .exporters import (SHOPPING_LIST_EXPORT_FORMATS, SHOPPING_LIST_FORMATS,
+                        export_records, get_shopping_list_export_path,
+                        iter_ndjson, iter_shopping_list)
 from .filters import RecipeFilter
+from .importers import import_recipes
 from .mixins import (AllowAnyPermissionsMixin, AuthenticatedPermissionMixin,
-                     GetUserMixin, NonePaginationPermissionMixin)
+                     ConditionalGetMixin, GetUserMixin,
+                     NonePaginationPermissionMixin, ReaderMixin,
+                     ResponseCacheMixin)
+from .pagination import KeysetPagination, MergedValues
+from .parsers import ImageUploadParser, NDJSONParser
 from .permissions import IsAuthorOrAdminOrReadOnly
-from .serializers import (AvatarSerializer, IngredientSerializer,
-                          RecipeCreateSerializer, RecipeSerializer,
+from .readers import RecipeReader, SubscriptionReader
+from .renderers import CSVRenderer, PlainTextRenderer
+from .renditions import schedule_renditions
+from .serializers import (AdvancedUserSerializer, AvatarSerializer,
+                          ExportSerializer, IngredientSerializer,
+                          JobSerializer, RecipeCreateSerializer,
+                          RecipeIdsSerializer, RecipeImageSerializer,
+                          RecipeSerializer, ShoppingListExportSerializer,
                           ShortRecipeSerializer, SubscriptionUserSerializer,
                           TagSerializer)
-from .utils import available_subscription, get_recipes_filter_by_field_name
-from recipes.models import (Ingredient, Recipe, RecipeIngredient, Subscription,
-                            Tag)
+from .utils import (annotate_recipes, annotate_subscriptions, annotate_users,
+                    autocomplete_ingredients, available_subscription,
+                    closing_uploads, get_autocomplete_limit, get_feed_sources,
+                    get_recipes_limit, get_requested_fields,
+                    get_shopping_cart_etag, get_shopping_cart_hash,
+                    get_shopping_list_rows, link_recipes, unlink_recipes)
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.models import Ingredient, Recipe, Subscription, Tag
 
 User = get_user_model()
 
 
+def get_export_response(request, dataset):
+    """
+    Потоковая выгрузка набора dataset в NDJSON, при gzip=true - сжатая.
+    Параметр after продолжает выгрузку после записи с этим id.
+    """
+    serializer = ExportSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    compress = serializer.validated_data['gzip']
+    file_name = f'{dataset}.ndjson'
+    content_type = 'application/x-ndjson'
+    if compress:
+        file_name = f'{file_name}.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        iter_ndjson(
+            export_records(
+                dataset, after=serializer.validated_data['after']
+            ),
+            compress=compress,
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
 class AvatarView(AuthenticatedPermissionMixin):
-    """Представление для добавления и удаления аватара пользователя."""
+    """
+    Представление для добавления и удаления аватара пользователя.
+    Аватар принимается строкой base64, файлом в multipart/form-data
+    или телом запроса с Content-Type: image/*.
+    """
+
+    parser_classes = [JSONParser, MultiPartParser, ImageUploadParser]
+    upload_field_name = 'avatar'
 
     def put(self, request):
         user = self.get_user()
-        serializer = AvatarSerializer(
-            data=request.data,
-            context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        user.avatar = serializer.validated_data['avatar']
-        user.save()
+        with closing_uploads(request) as data:
+            serializer = AvatarSerializer(
+                data=data,
+                context={'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            user.avatar = serializer.validated_data['avatar']
+            user.avatar_variants = {}
+            user.save()
+        schedule_renditions(user, 'avatar')
         return Response({'avatar': f'{DOMAIN}{user.avatar.url}'})
 
     def delete(self, request):
         user = self.get_user()
         user.avatar = None
-        user.save(update_fields=['avatar'])
+        user.avatar_variants = {}
+        user.save(update_fields=['avatar', 'avatar_variants', 'updated'])
         return Response(
             {'detail': 'Аватар успешно удалён'},
             status=status.HTTP_204_NO_CONTENT
@@ -84,66 +157,278 @@ class SubscribeView(AuthenticatedPermissionMixin):
         )
 
 
-class SubscriptionsView(AuthenticatedPermissionMixin, generics.ListAPIView):
-    """Показывает список подписок."""
+class SubscriptionsView(
+    AuthenticatedPermissionMixin, ReaderMixin, generics.ListAPIView
+):
+    """Показывает список подписок, новые подписки первыми."""
 
     serializer_class = SubscriptionUserSerializer
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-subscription_id',)
 
     def get_queryset(self):
-        return User.objects.filter(followers__user=self.get_user())
+        return annotate_subscriptions(
+            User.objects.filter(followers__user=self.get_user()).annotate(
+                subscription_id=F('followers__id')
+            ).order_by('-subscription_id'),
+            get_recipes_limit(self.request),
+            self.get_fields(),
+        )
 
+    def get_fields(self):
+        return get_requested_fields(
+            self.request, SubscriptionUserSerializer.Meta.fields
+        )
+
+    def get_reader(self):
+        return SubscriptionReader(
+            self.request, self.get_fields(), get_recipes_limit(self.request)
+        )
 
-class RecipeViewSet(GetUserMixin, viewsets.ModelViewSet):
+
+class UserViewSet(ConditionalGetMixin, DjoserUserViewSet):
+    """Пользователи djoser с поддержкой условных GET-запросов."""
+
+    def get_queryset(self):
+        return annotate_users(
+            super().get_queryset(),
+            self.request.user,
+            get_requested_fields(
+                self.request, AdvancedUserSerializer.Meta.fields
+            ),
+        )
+
+    def get_list_validators(self):
+        return tuple(self.filter_queryset(self.get_queryset()).aggregate(
+            users_updated=Max('updated'), users_count=Count('id'),
+        ).values())
+
+    def get_object_validators(self):
+        if self.action == 'me':
+            return (self.request.user.updated,)
+        return self.get_queryset().filter(
+            **{self.lookup_field: self.kwargs[self.lookup_field]}
+        ).values_list('updated').first()
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Выгружает пользователей администратору в NDJSON."""
+        return get_export_response(request, 'users')
+
+
+class RecipeViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    ReaderMixin,
+    GetUserMixin,
+    viewsets.ModelViewSet,
+):
     """Предстваление отображения рецепта."""
 
     http_method_names = ['get', 'post', 'patch', 'delete']
-    queryset = Recipe.objects.all().order_by('-created')
+    upload_field_name = 'image'
+    queryset = Recipe.objects.all().order_by('-created', '-id')
     lookup_field = 'pk'
+    lookup_value_regex = r'\d+'
+    pagination_class = KeysetPagination
+    cache_models = ('recipe', 'recipeingredient', 'tag', 'ingredient', 'user')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        return annotate_recipes(
+            super().get_queryset(), self.get_user(), self.get_fields()
+        )
+
+    def get_fields(self):
+        """Поля RecipeSerializer, выбранные параметрами fields и omit."""
+        return get_requested_fields(
+            self.request, RecipeSerializer.Meta.fields
+        )
+
+    def get_reader(self):
+        return RecipeReader(self.request, self.get_fields())
+
+    def list(self, request, *args, **kwargs):
+        """С параметром ids=1,5,9 отдаёт рецепты из списка без пагинации."""
+        if 'ids' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.get_conditional_response(
+            self.get_list_validators,
+            partial(self.get_cached_response, self.list_by_ids),
+            request,
+        )
+
+    def list_by_ids(self, request):
+        serializer = RecipeIdsSerializer(
+            data={'ids': request.query_params['ids'].split(',')}
+        )
+        serializer.is_valid(raise_exception=True)
+        return self.get_recipes_by_ids(serializer.validated_data['ids'])
+
+    def get_recipes_by_ids(self, ids):
+        """
+        Загружает рецепты из списка ids за постоянное число запросов.
+        Порядок совпадает с запрошенным, отсутствующие id перечислены
+        в missing.
+        """
+        ids = list(dict.fromkeys(ids))
+        reader = self.get_reader()
+        recipes = {
+            row['id']: row for row in reader.get_queryset(
+                self.filter_queryset(self.get_queryset())
+            ).filter(pk__in=ids)
+        }
+        return Response({
+            'results': reader.represent(
+                recipes[pk] for pk in ids if pk in recipes
+            ),
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+    def get_list_validators(self):
+        state = self.filter_queryset(Recipe.objects.all()).aggregate(
+            recipes_updated=Max('updated'),
+            authors_updated=Max('author__updated'),
+            recipes_count=Count('id'),
+        )
+        return (*state.values(), *get_generations(('tag', 'ingredient')))
+
+    def get_object_validators(self):
+        state = Recipe.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated', 'author__updated'
+        ).first()
+        if state is None:
+            return None
+        return (*state, *get_generations(('tag', 'ingredient')))
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return RecipeCreateSerializer
 
     def get_permissions(self):
-        if self.request.method in SAFE_METHODS:
-            return [AllowAny()]
-        elif self.action == 'create':
+        if self.action in ('bulk', 'export'):
+            return [IsAdminUser()]
+        elif self.action in (
+            'create', 'download_shopping_cart', 'shopping_cart_exports',
+            'shopping_cart_export', 'feed',
+        ):
             return [IsAuthenticated()]
+        elif self.request.method in SAFE_METHODS or self.action == 'bulk_get':
+            return [AllowAny()]
         return [IsAuthorOrAdminOrReadOnly()]
 
     def _handler_favorite_or_shopping_cart(
             self, request, field_name='is_favorited', pk=None
     ):
+        """
+        Добавляет рецепт в избранное или корзину и убирает его оттуда
+        одним запросом; по числу изменённых строк выбирается ответ.
+        """
         user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        serializer = ShortRecipeSerializer(
-            recipe, context={'request': request}
-        )
-        filtered_recipes = get_recipes_filter_by_field_name(field_name, user)
-        add_error_msg = RESPONSE_MESSAGES.get(field_name).get('error_add')
-        del_error_msg = RESPONSE_MESSAGES.get(field_name).get('error_del')
-        detail_msg = RESPONSE_MESSAGES.get(field_name).get('detail')
-        field = getattr(recipe, field_name)
-
+        messages = RESPONSE_MESSAGES[field_name]
         if request.method == 'POST':
-            if filtered_recipes.filter(id=recipe.id).exists():
+            if link_recipes(field_name, user, [pk]):
+                serializer = ShortRecipeSerializer(
+                    Recipe.objects.get(pk=pk), context={'request': request}
+                )
                 return Response(
-                    {'errors': add_error_msg},
-                    status=status.HTTP_400_BAD_REQUEST
+                    serializer.data, status=status.HTTP_201_CREATED
                 )
-            field.add(user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            error = messages['error_add']
+        elif unlink_recipes(field_name, user, [pk]):
+            return Response(
+                {'detail': messages['detail']},
+                status=status.HTTP_204_NO_CONTENT,
+            )
+        else:
+            error = messages['error_del']
+        get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        return Response(
+            {'errors': error}, status=status.HTTP_400_BAD_REQUEST
+        )
 
-        if not filtered_recipes.filter(id=recipe.id).exists():
+    def _handler_batch(self, request, field_name):
+        """
+        Добавляет (POST) или убирает (DELETE) рецепты из списка ids
+        одним запросом. В ответе - id рецептов, которые действительно
+        добавлены или убраны.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['ids']
+        if request.method == 'POST':
             return Response(
-                {'errors': del_error_msg}, status=status.HTTP_400_BAD_REQUEST
+                {'added': link_recipes(field_name, request.user, recipe_ids)}
             )
-        field.remove(user)
         return Response(
-            {'detail': detail_msg}, status=status.HTTP_204_NO_CONTENT
+            {'removed': unlink_recipes(field_name, request.user, recipe_ids)}
+        )
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=(JSONParser, NDJSONParser),
+    )
+    def bulk(self, request):
+        """
+        Импортирует рецепты текущего пользователя из JSON-массива или
+        NDJSON. В отчёте для каждого рецепта - его id или ошибки.
+        """
+        rows = ListField(
+            allow_empty=False, max_length=MAX_IMPORT_RECIPES
+        ).run_validation(request.data)
+        results = list(import_recipes(enumerate(rows, 1), request.user))
+        created = sum('id' in result for result in results)
+        return Response(
+            {
+                'created': created,
+                'failed': len(results) - created,
+                'results': results,
+            },
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Выгружает все рецепты администратору в NDJSON: по рецепту с id
+        тегов, ингредиентами, id автора и путём к изображению в строке.
+        """
+        return get_export_response(request, 'recipes')
+
+    @action(detail=False, methods=['post'])
+    def bulk_get(self, request):
+        """Отдаёт рецепты из списка ids в теле запроса, как list с ids."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.get_recipes_by_ids(serializer.validated_data['ids'])
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Рецепты авторов, на которых подписан пользователь. Страница
+        ленты выбирается по записям TimelineEntry и рецептам популярных
+        авторов, затем рецепты страницы загружаются по id.
+        """
+        user = self.get_user()
+        self.cursor_ordering = FEED_CURSOR_ORDERING
+        page = self.paginate_queryset(MergedValues(*get_feed_sources(
+            user, self.filter_queryset(Recipe.objects.all())
+        )).order_by(*FEED_CURSOR_ORDERING))
+        ids = [row['recipe_id'] for row in page]
+        reader = self.get_reader()
+        rows = {
+            row['id']: row for row in reader.get_queryset(annotate_recipes(
+                Recipe.objects.filter(pk__in=ids), user, self.get_fields()
+            ))
+        }
+        return self.get_paginated_response(
+            reader.represent(rows[pk] for pk in ids if pk in rows)
         )
 
     @action(detail=True, methods=['post', 'delete'])
@@ -158,40 +443,167 @@ class RecipeViewSet(GetUserMixin, viewsets.ModelViewSet):
             request, 'is_in_shopping_cart', pk=pk
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch',
+    )
+    def favorite_batch(self, request):
+        """Добавляет и удаляет из избранного несколько рецептов."""
+        return self._handler_batch(request, 'is_favorited')
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+    )
+    def shopping_cart_batch(self, request):
+        """Добавляет и удаляет из списка покупок несколько рецептов."""
+        return self._handler_batch(request, 'is_in_shopping_cart')
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer],
         methods=['get']
     )
     def download_shopping_cart(self, request):
-        """Выгружает список покупок пользователю."""
+        """
+        Выгружает список покупок пользователю в формате txt, csv или json
+        (параметр format). Строки списка читаются одним запросом: их
+        число ограничено числом ингредиентов в корзине. По строкам
+        вычисляется ETag, а файл формируется из них один раз и
+        передаётся с Content-Length. Повторный запрос неизменившегося
+        списка получает ответ 304.
+        """
         user = self.get_user()
-        users_recipes_in_cart = get_recipes_filter_by_field_name(
-            'is_in_shopping_cart', user
-        ).values_list('id', flat=True)
-        users_ingredients = RecipeIngredient.objects.filter(
-            recipe__in=users_recipes_in_cart
-        ).order_by('ingredient')
-        ingredients_summary = users_ingredients.values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total_amount=Sum('amount'))
-        file_name = f'shopping_cart_{user.username}.txt'
-        content = ['Ваш список покупок:', ]
-
-        for ingredient in ingredients_summary:
-            name = ingredient['ingredient__name']
-            measurement_init = ingredient['ingredient__measurement_unit']
-            amount = ingredient['total_amount']
-            content.append(f'{name} - {amount} {measurement_init}')
-
-        file_content = '\n'.join(content)
-
-        response = HttpResponse(
-            file_content, content_type='text/plain; charset=utf-8'
+        export_format = request.query_params.get(
+            'format', PlainTextRenderer.format
         )
+        rows = list(get_shopping_list_rows(user))
+        etag = get_shopping_cart_etag(user, rows, export_format)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        content_type, _ = SHOPPING_LIST_FORMATS[export_format]
+        file_name = f'shopping_cart_{user.username}.{export_format}'
+        content = b''.join(iter_shopping_list(rows, export_format))
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Length'] = len(content)
+        response['ETag'] = etag
         response['Content-Disposition'] = f'attachment; filename="{file_name}"'
         return response
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='download_shopping_cart/jobs',
+        url_name='shopping-cart-exports',
+    )
+    def shopping_cart_exports(self, request):
+        """
+        Ставит в очередь выгрузку списка покупок в pdf или csv и
+        возвращает задачу. Файл общий для одинаковых корзин: если такая
+        корзина уже выгружалась, задача сразу выполнена, а срок хранения
+        файла продлевается.
+        """
+        serializer = ShoppingListExportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = self.get_user()
+        export_format = serializer.validated_data['format']
+        payload = {'user_id': user.pk, 'export_format': export_format}
+        cart_hash = get_shopping_cart_hash(
+            get_shopping_list_rows(user).iterator(
+                chunk_size=ITERATOR_CHUNK_SIZE
+            )
+        )
+        try:
+            os.utime(get_shopping_list_export_path(cart_hash, export_format))
+        except FileNotFoundError:
+            job = enqueue('export_shopping_list', payload, user=user)
+        else:
+            job = Job.objects.create(
+                name='export_shopping_list',
+                payload=payload,
+                user=user,
+                status=Job.Status.DONE,
+                result={'cart_hash': cart_hash, 'format': export_format},
+                finished=timezone.now(),
+            )
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'download_shopping_cart/jobs/(?P<job_id>\d+)',
+        url_name='shopping-cart-export',
+    )
+    def shopping_cart_export(self, request, job_id=None):
+        """
+        Отдаёт файл выполненной выгрузки списка покупок. Пока задача
+        не выполнена, возвращает её состояние: 202 - в работе,
+        409 - выгрузка завершилась ошибкой.
+        """
+        job = get_object_or_404(
+            self.get_user().jobs, pk=job_id, name='export_shopping_list'
+        )
+        if job.status != Job.Status.DONE:
+            return Response(
+                JobSerializer(job).data,
+                status=(
+                    status.HTTP_409_CONFLICT
+                    if job.status == Job.Status.FAILED
+                    else status.HTTP_202_ACCEPTED
+                ),
+            )
+        cart_hash = job.result['cart_hash']
+        export_format = job.result['format']
+        etag = quote_etag(f'{cart_hash}.{export_format}')
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        try:
+            file = open(
+                get_shopping_list_export_path(cart_hash, export_format), 'rb'
+            )
+        except FileNotFoundError:
+            raise Http404
+        content_type, _ = SHOPPING_LIST_EXPORT_FORMATS[export_format]
+        response = FileResponse(
+            file,
+            as_attachment=True,
+            filename=f'shopping_cart_{request.user.username}.{export_format}',
+            content_type=content_type,
+        )
+        response['ETag'] = etag
+        return response
+
+    @action(
+        detail=True,
+        methods=['put'],
+        http_method_names=['put', 'options'],
+        parser_classes=[ImageUploadParser, MultiPartParser, JSONParser],
+    )
+    def image(self, request, pk=None):
+        """
+        Заменяет изображение рецепта. Изображение передаётся телом
+        запроса с Content-Type: image/*, файлом image в multipart/form-data
+        или строкой base64.
+        """
+        recipe = self.get_object()
+        with closing_uploads(request) as data:
+            serializer = RecipeImageSerializer(
+                recipe, data=data, context={'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['get'],
@@ -216,20 +628,62 @@ class DecodeLinkView(AllowAnyPermissionsMixin):
         return redirect(recipe_url)
 
 
-class TagViewSet(NonePaginationPermissionMixin, viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ResponseCacheMixin,
+    NonePaginationPermissionMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Представление отображения тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_models = ('tag',)
 
 
 class IngredientViewSet(
-    NonePaginationPermissionMixin, viewsets.ReadOnlyModelViewSet
+    ResponseCacheMixin,
+    NonePaginationPermissionMixin,
+    viewsets.ReadOnlyModelViewSet,
 ):
-    """Представление отображения тегов."""
+    """
+    Представление отображения ингредиентов. С параметром name
+    возвращает не больше limit подсказок для автодополнения.
+    """
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
-    filterset_fields = ('name',)
-    search_fields = ('^name',)
+    cache_models = ('ingredient',)
+
+    def list(self, request, *args, **kwargs):
+        if 'name' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(
+            self.autocomplete, request, *args, **kwargs
+        )
+
+    def autocomplete(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            autocomplete_ingredients(
+                request.query_params['name'], get_autocomplete_limit(request)
+            ),
+            many=True,
+        )
+        return Response(serializer.data)
+
+
+class JobView(AuthenticatedPermissionMixin, generics.RetrieveAPIView):
+    """Показывает состояние фоновой задачи, поставленной пользователем."""
+
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return self.get_user().jobs.all()
+
+
+class CacheStatsView(APIView):
+    """Показывает администратору счётчики кэша ответов."""
+
+    permission_classes = [IsAdminUser, ]
+
+    def get(self, request):
+        return Response(get_cache_stats())
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -75,6 +76,15 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': env.str(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env.str('CACHE_LOCATION', ''),
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,6 +118,28 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/var/www/foodgram/media/'
+# Файлы, которые отдаются только через API, например выгрузки
+# списков покупок. Каталог должен быть общим для backend и worker.
+PRIVATE_MEDIA_ROOT = env.path('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media')
+# Шрифт с кириллицей для выгрузки списка покупок в PDF.
+SHOPPING_LIST_PDF_FONT = env.str(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+STORAGES = {
+    'default': {
+        'BACKEND': 'api.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Загружаемые файлы сразу пишутся во временный файл, а не в память.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# True - фоновые задачи выполняются в процессе запроса после фиксации
+# транзакции, без отдельного обработчика run_workers.
+JOBS_EAGER = env.bool('JOBS_EAGER', False)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Администрирование фоновых задач."""
+
+    list_display = (
+        'name', 'status', 'attempts', 'user', 'created', 'finished'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('locked_by', 'locked_at', 'result', 'error')
@@ -0,0 +1,10 @@
+MAX_LENGTH_JOB_NAME = 64
+MAX_LENGTH_WORKER_NAME = 128
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_TIMEOUT = 10 * 60
+JOB_HEARTBEAT_INTERVAL = 60
+JOB_REQUEUE_INTERVAL = 60
+JOB_POLL_INTERVAL = 1.0
+JOB_WORKER_PROCESSES = 2
@@ -0,0 +1,69 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.constants import JOB_POLL_INTERVAL, JOB_WORKER_PROCESSES
+from jobs.queue import work
+
+
+def run_worker(once, poll_interval):
+    """Запускает цикл обработчика и завершает его по SIGTERM или SIGINT."""
+    stop = threading.Event()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda *args: stop.set())
+    try:
+        work(once=once, poll_interval=poll_interval, stop=stop)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запустить обработчики очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=JOB_WORKER_PROCESSES,
+            help='Число процессов-обработчиков.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=JOB_POLL_INTERVAL,
+            help='Пауза в секундах, если очередь пуста.'
+        )
+
+    def handle(self, *args, **options):
+        arguments = (options['once'], options['poll'])
+        if options['processes'] <= 1:
+            run_worker(*arguments)
+            return
+        # Дочерние процессы не должны наследовать соединения с БД.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_worker, args=arguments)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, stop)
+        for process in processes:
+            process.join()
+        self.stdout.write('Обработчики остановлены.')
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='задача')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='параметры')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'ошибка')], default='queued', max_length=7, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='максимум попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='запустить после')),
+                ('locked_by', models.CharField(blank=True, max_length=128, verbose_name='обработчик')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='взята в работу')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='результат')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='дата завершения')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ('-created',),
+                'indexes': [models.Index(fields=['status', 'run_at'], name='job_queue_idx')],
+            },
+        ),
+    ]
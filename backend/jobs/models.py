@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+from .constants import (JOB_MAX_ATTEMPTS, MAX_LENGTH_JOB_NAME,
+                        MAX_LENGTH_WORKER_NAME)
+
+User = get_user_model()
+
+
+class Job(models.Model):
+    """Фоновая задача, которую выполняет команда run_workers."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'в очереди'
+        RUNNING = 'running', 'выполняется'
+        DONE = 'done', 'выполнена'
+        FAILED = 'failed', 'ошибка'
+
+    name = models.CharField(
+        max_length=MAX_LENGTH_JOB_NAME, verbose_name='задача'
+    )
+    payload = models.JSONField(
+        verbose_name='параметры', default=dict, blank=True
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='пользователь',
+        related_name='jobs',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        max_length=max(len(value) for value in Status.values),
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name='статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='попыток', default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='максимум попыток', default=JOB_MAX_ATTEMPTS
+    )
+    run_at = models.DateTimeField(
+        verbose_name='запустить после', default=timezone.now
+    )
+    locked_by = models.CharField(
+        max_length=MAX_LENGTH_WORKER_NAME,
+        verbose_name='обработчик',
+        blank=True,
+    )
+    locked_at = models.DateTimeField(
+        verbose_name='взята в работу', null=True, blank=True
+    )
+    result = models.JSONField(verbose_name='результат', null=True, blank=True)
+    error = models.TextField(verbose_name='ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='дата создания', auto_now_add=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='дата завершения', null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=('status', 'run_at'), name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
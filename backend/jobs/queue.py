@@ -0,0 +1,221 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+
+from .constants import (JOB_HEARTBEAT_INTERVAL, JOB_MAX_ATTEMPTS,
+                        JOB_POLL_INTERVAL, JOB_REQUEUE_INTERVAL,
+                        JOB_RETRY_DELAY, JOB_RETRY_MAX_DELAY, JOB_TIMEOUT)
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Регистрирует функцию как фоновую задачу. Параметры задачи
+    передаются ей именованными аргументами, результат сохраняется в Job.
+    """
+    def decorator(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, user=None):
+    """
+    Ставит задачу в очередь. Запись создаётся в текущей транзакции,
+    поэтому обработчик увидит задачу только после её фиксации.
+    """
+    return enqueue_many(name, [payload], user)[0]
+
+
+def enqueue_many(name, payloads, user=None):
+    """Ставит в очередь задачи name с параметрами payloads одним INSERT."""
+    _, max_attempts = TASKS[name]
+    jobs = Job.objects.bulk_create(
+        Job(
+            name=name,
+            payload=payload or {},
+            user=user,
+            max_attempts=max_attempts,
+        )
+        for payload in payloads
+    )
+    if settings.JOBS_EAGER:
+        for job in jobs:
+            transaction.on_commit(partial(
+                run_next_job, get_worker_name(), Job.objects.filter(pk=job.pk)
+            ))
+    return jobs
+
+
+def get_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_stale_jobs():
+    """
+    Возвращает в очередь задачи обработчиков, завершившихся аварийно:
+    живой обработчик продлевает locked_at выполняемой задачи каждые
+    JOB_HEARTBEAT_INTERVAL секунд, упавший - перестаёт.
+    """
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=JOB_TIMEOUT),
+    ).update(status=Job.Status.QUEUED, locked_by='', locked_at=None)
+
+
+def claim_job(worker_name, queryset=None):
+    """
+    Берёт в работу первую готовую задачу. В PostgreSQL строка выбирается
+    через SELECT ... FOR UPDATE SKIP LOCKED, и обработчики не ждут друг
+    друга. В SQLite блокировок строк нет: задачу закрепляет за
+    обработчиком UPDATE с условием на статус вне транзакции,
+    проигравший берёт следующую.
+    """
+    if queryset is None:
+        queryset = Job.objects.all()
+    queryset = queryset.filter(
+        status=Job.Status.QUEUED, run_at__lte=timezone.now()
+    ).order_by('run_at', 'pk').only('pk')
+    locking = connection.features.has_select_for_update_skip_locked
+    if locking:
+        queryset = queryset.select_for_update(skip_locked=True)
+    while True:
+        with transaction.atomic() if locking else nullcontext():
+            job = queryset.first()
+            if job is None:
+                return None
+            claimed = Job.objects.filter(
+                pk=job.pk, status=Job.Status.QUEUED
+            ).update(
+                status=Job.Status.RUNNING,
+                locked_by=worker_name,
+                locked_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+        if claimed:
+            return Job.objects.get(pk=job.pk)
+
+
+def keep_alive(job, done, interval=JOB_HEARTBEAT_INTERVAL):
+    """
+    Продлевает блокировку задачи каждые interval секунд, пока не
+    установлено событие done, чтобы requeue_stale_jobs не отдал
+    долгую задачу, например выгрузку CSV, второму обработчику.
+    """
+    while not done.wait(interval):
+        try:
+            Job.objects.filter(
+                pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by
+            ).update(locked_at=timezone.now())
+        except DatabaseError:
+            logger.exception('Не удалось продлить задачу %s', job)
+
+
+def call_with_heartbeat(func, job):
+    """Вызывает обработчик задачи, продлевая её блокировку в потоке."""
+    done = threading.Event()
+
+    def heartbeat():
+        try:
+            keep_alive(job, done)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        return func(**job.payload)
+    finally:
+        done.set()
+        thread.join()
+
+
+def run_job(job):
+    """
+    Выполняет задачу. После ошибки задача возвращается в очередь
+    с экспоненциально растущей задержкой, пока не кончатся попытки.
+    """
+    func, _ = TASKS.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}.')
+        result = call_with_heartbeat(func, job)
+    except Exception:
+        logger.exception('Задача %s завершилась с ошибкой', job)
+        error = traceback.format_exc()
+        jobs = Job.objects.filter(pk=job.pk)
+        if func is not None and job.attempts < job.max_attempts:
+            delay = min(
+                JOB_RETRY_DELAY * 2 ** (job.attempts - 1), JOB_RETRY_MAX_DELAY
+            )
+            jobs.update(
+                status=Job.Status.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                locked_by='',
+                locked_at=None,
+                error=error,
+            )
+        else:
+            jobs.update(
+                status=Job.Status.FAILED,
+                finished=timezone.now(),
+                error=error,
+            )
+        return
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.Status.DONE,
+        finished=timezone.now(),
+        result=result,
+        error='',
+    )
+
+
+def run_next_job(worker_name, queryset=None):
+    """Выполняет одну задачу из очереди, если она есть."""
+    job = claim_job(worker_name, queryset)
+    if job is not None:
+        run_job(job)
+    return job
+
+
+def work(once=False, poll_interval=JOB_POLL_INTERVAL, stop=None,
+         requeue_interval=JOB_REQUEUE_INTERVAL):
+    """
+    Цикл обработчика: выполняет задачи, а при пустой очереди ждёт
+    poll_interval секунд. С once=True завершается, когда очередь пуста.
+    Каждые requeue_interval секунд возвращает в очередь задачи
+    обработчиков, завершившихся аварийно, пока остальные работают.
+    """
+    stop = stop or threading.Event()
+    worker_name = get_worker_name()
+    requeue_at = time.monotonic()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            if time.monotonic() >= requeue_at:
+                requeue_stale_jobs()
+                requeue_at = time.monotonic() + requeue_interval
+            job = run_next_job(worker_name)
+        except DatabaseError:
+            logger.exception('Очередь задач недоступна')
+            job = None
+        if job is None:
+            if once:
+                return
+            stop.wait(poll_interval)
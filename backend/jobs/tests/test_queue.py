@@ -0,0 +1,70 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs.constants import JOB_TIMEOUT
+from jobs.models import Job
+from jobs.queue import (claim_job, enqueue, keep_alive, requeue_stale_jobs,
+                        task, work)
+
+
+@task('test_crash_other_worker')
+def crash_other_worker(job_id):
+    """Имитирует обработчик, который упал, не завершив задачу."""
+    Job.objects.filter(pk=job_id).update(
+        status=Job.Status.RUNNING,
+        locked_by='dead-worker',
+        locked_at=timezone.now() - timedelta(seconds=JOB_TIMEOUT + 1),
+    )
+
+
+@task('test_noop')
+def noop():
+    return 'ok'
+
+
+@mock.patch('jobs.queue.close_old_connections')
+class WorkTest(TestCase):
+    """Работающий обработчик подбирает задачи упавших обработчиков."""
+
+    def test_requeue_stale_jobs_while_working(self, close_old_connections):
+        stale = enqueue('test_noop')
+        crash = enqueue('test_crash_other_worker', {'job_id': stale.pk})
+        Job.objects.filter(pk=crash.pk).update(
+            run_at=timezone.now() - timedelta(minutes=1)
+        )
+        with mock.patch('jobs.queue.get_worker_name', return_value='alive'):
+            work(once=True, requeue_interval=0)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.Status.DONE)
+        self.assertEqual(stale.result, 'ok')
+
+
+class HeartbeatTest(TestCase):
+    """Долгая задача не возвращается в очередь, пока обработчик жив."""
+
+    def test_keep_alive(self):
+        job = enqueue('test_noop')
+        job = claim_job('alive', Job.objects.filter(pk=job.pk))
+        stale = timezone.now() - timedelta(seconds=JOB_TIMEOUT + 1)
+        Job.objects.filter(pk=job.pk).update(locked_at=stale)
+        done = mock.Mock()
+        done.wait.side_effect = [False, True]
+        keep_alive(job, done)
+        self.assertEqual(requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+        self.assertEqual(job.locked_by, 'alive')
+        self.assertGreater(job.locked_at, stale)
+
+    @mock.patch('jobs.queue.close_old_connections')
+    def test_heartbeat_stops(self, close_old_connections):
+        job = enqueue('test_noop')
+        threads = threading.active_count()
+        work(once=True)
+        self.assertEqual(threading.active_count(), threads)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
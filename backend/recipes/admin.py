@@ -10,15 +10,11 @@ admin.site.register(Subscription)
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorites_count')
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
     search_fields = ('author', 'name')
     list_filter = ('tags',)
-    readonly_fields = ('favorites_count',)
-
-    def favorites_count(self, obj):
-        return obj.is_favorited.count()
-
-    favorites_count.short_description = 'Количество добавлений в избранное'
+    list_select_related = ('author',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
 
 @admin.register(Ingredient)
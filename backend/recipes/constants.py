@@ -2,3 +2,8 @@ MAX_LENGTH_TAG = 32
 MAX_LENGTH_INGREDIENT_NAME = 128
 MAX_LENGTH_INGREDIENT_UNIT = 64
 MAX_LENGTH_RECIPE = 256
+MAX_LENGTH_FILE_NAME = 255
+BATCH_SIZE = 2000
+MEDIA_GARBAGE_MIN_AGE_HOURS = 24
+MEDIA_GARBAGE_WORKERS = 8
+FEED_FANOUT_MAX_FOLLOWERS = 10_000
@@ -0,0 +1,148 @@
+import secrets
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.readers import RecipeReader
+from api.serializers import RecipeSerializer
+from api.utils import annotate_recipes
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+BENCHMARK_SIZES = (10, 100, 1000)
+BENCHMARK_REPEAT = 5
+TAGS_PER_RECIPE = 3
+INGREDIENTS_PER_RECIPE = 8
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить время ответа со списком рецептов через RecipeSerializer '
+        'и через RecipeReader. Тестовые данные создаются в транзакции, '
+        'которая затем откатывается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=BENCHMARK_SIZES,
+            help='Число рецептов в ответе.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=BENCHMARK_REPEAT,
+            help='Число повторов, берётся лучшее время.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, recipe_ids = self.create_recipes(max(options['sizes']))
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = user
+            self.stdout.write(
+                'Рецептов | Сериализаторы, мс | values(), мс | Ускорение'
+            )
+            for size in options['sizes']:
+                queryset = Recipe.objects.filter(
+                    pk__in=recipe_ids[:size]
+                ).order_by('-created', '-id')
+                serialized, serializer_time = self.measure(
+                    self.serialize, queryset, request, options['repeat']
+                )
+                read, reader_time = self.measure(
+                    self.read, queryset, request, options['repeat']
+                )
+                if serialized != read:
+                    raise CommandError(
+                        f'Ответы для {size} рецептов не совпадают.'
+                    )
+                self.stdout.write(
+                    f'{size:>8} | {serializer_time * 1000:>17.1f} | '
+                    f'{reader_time * 1000:>12.1f} | '
+                    f'{serializer_time / reader_time:>8.1f}x'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(func, queryset, request, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = func(queryset, request)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return content, best
+
+    @staticmethod
+    def serialize(queryset, request):
+        serializer = RecipeSerializer(
+            annotate_recipes(queryset, request.user),
+            many=True,
+            context={'request': request},
+        )
+        return JSONRenderer().render(serializer.data)
+
+    @staticmethod
+    def read(queryset, request):
+        reader = RecipeReader(request)
+        return JSONRenderer().render(reader.represent(
+            reader.get_queryset(annotate_recipes(queryset, request.user))
+        ))
+
+    @staticmethod
+    def create_recipes(count):
+        """
+        Создаёт автора, теги, ингредиенты и count рецептов через
+        bulk_create, чтобы не вызывать сигналы и фоновые задачи.
+        """
+        suffix = secrets.token_hex(4)
+        [user] = User.objects.bulk_create([User(
+            email=f'benchmark-{suffix}@example.com',
+            username=f'benchmark-{suffix}',
+            first_name='Benchmark',
+            last_name='Benchmark',
+            avatar='users/benchmark.png',
+        )])
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'benchmark-{number}-{suffix}',
+                slug=f'benchmark-{number}-{suffix}')
+            for number in range(TAGS_PER_RECIPE)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f'benchmark-{number}-{suffix}', measurement_unit='г'
+            )
+            for number in range(INGREDIENTS_PER_RECIPE)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'Рецепт {number}',
+                image=f'recipes/benchmark-{number}.png',
+                text='Описание рецепта. ' * 20,
+                cooking_time=number % 120 + 1,
+            )
+            for number in range(count)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=number + 1
+            )
+            for recipe in recipes
+            for number, ingredient in enumerate(ingredients)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in tags
+        )
+        return user, [recipe.pk for recipe in recipes]
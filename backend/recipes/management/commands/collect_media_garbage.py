@@ -0,0 +1,206 @@
+import os
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.constants import (RENDITIONS_DIR, SHOPPING_LIST_EXPORT_DIR,
+                           SHOPPING_LIST_EXPORT_TTL_HOURS)
+from recipes.constants import (BATCH_SIZE, MEDIA_GARBAGE_MIN_AGE_HOURS,
+                               MEDIA_GARBAGE_WORKERS)
+from recipes.models import Recipe, StoredFile
+
+User = get_user_model()
+
+FILE_FIELDS = ((Recipe, 'image'), (User, 'avatar'))
+
+
+def iter_files(path):
+    """Отдаёт файлы каталога по мере чтения, не загружая список целиком."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def iter_directories(path):
+    """Обходит вложенные каталоги, кроме каталогов уменьшенных копий."""
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        yield directory
+        with os.scandir(directory) as entries:
+            stack.extend(
+                entry.path for entry in entries
+                if entry.is_dir(follow_symlinks=False)
+                and entry.name != RENDITIONS_DIR
+            )
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_referenced(names):
+    """Возвращает имена из names, на которые ссылаются объекты в БД."""
+    referenced = set()
+    for model, field_name in FILE_FIELDS:
+        referenced.update(
+            model.objects.filter(**{f'{field_name}__in': names}).values_list(
+                field_name, flat=True
+            ).iterator(chunk_size=BATCH_SIZE)
+        )
+    return referenced
+
+
+class Command(BaseCommand):
+    help = (
+        'Удалить из MEDIA_ROOT изображения, на которые не ссылаются '
+        'рецепты и пользователи, вместе с их уменьшенными копиями, '
+        'и устаревшие выгрузки списков покупок из PRIVATE_MEDIA_ROOT'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько файлов будет удалено.'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=MEDIA_GARBAGE_MIN_AGE_HOURS,
+            help='Не трогать файлы моложе указанного числа часов.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=MEDIA_GARBAGE_WORKERS,
+            help='Число потоков для удаления файлов.'
+        )
+        parser.add_argument(
+            '--exports-ttl',
+            type=float,
+            default=SHOPPING_LIST_EXPORT_TTL_HOURS,
+            help=(
+                'Удалять выгрузки списков покупок, которые не запрашивали '
+                'указанное число часов.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.deadline = time.time() - options['min_age'] * 60 * 60
+        self.stats = {'scanned': 0, 'deleted': 0, 'freed': 0}
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            self.executor = executor
+            for model, field_name in FILE_FIELDS:
+                upload_to = model._meta.get_field(field_name).upload_to
+                root = os.path.join(settings.MEDIA_ROOT, upload_to)
+                if not os.path.isdir(root):
+                    continue
+                for directory in iter_directories(root):
+                    self.collect_directory(directory)
+            self.collect_exports(
+                time.time() - options['exports_ttl'] * 60 * 60
+            )
+        self.stdout.write(
+            'Проверено файлов - {scanned}, {action} - {deleted}, '
+            'освобождено байт - {freed}.'.format(
+                action='к удалению' if self.dry_run else 'удалено',
+                **self.stats,
+            )
+        )
+
+    def collect_directory(self, directory):
+        """
+        Удаляет неиспользуемые файлы каталога. Копия из renditions/
+        остаётся, пока остаётся её оригинал.
+        """
+        kept_stems = set()
+        files = iter_files(directory)
+        while True:
+            batch = list(islice(files, BATCH_SIZE))
+            if not batch:
+                break
+            self.stats['scanned'] += len(batch)
+            names = {self.get_name(entry.path): entry for entry in batch}
+            referenced = get_referenced(list(names))
+            garbage = []
+            for name, entry in names.items():
+                if name in referenced or not self.is_old(entry):
+                    kept_stems.add(
+                        posixpath.splitext(posixpath.basename(name))[0]
+                    )
+                else:
+                    garbage.append(entry)
+            self.delete(garbage)
+            if not self.dry_run:
+                StoredFile.objects.filter(
+                    name__in=[self.get_name(entry.path) for entry in garbage],
+                    references=0,
+                ).delete()
+        renditions = os.path.join(directory, RENDITIONS_DIR)
+        if not os.path.isdir(renditions):
+            return
+        files = iter_files(renditions)
+        while True:
+            batch = list(islice(files, BATCH_SIZE))
+            if not batch:
+                break
+            self.stats['scanned'] += len(batch)
+            self.delete([
+                entry for entry in batch
+                if entry.name.rsplit('-', 1)[0] not in kept_stems
+                and self.is_old(entry)
+            ])
+
+    def collect_exports(self, deadline):
+        """
+        Удаляет выгрузки списков покупок, срок хранения которых истёк:
+        при каждом повторном запросе выгрузки время изменения файла
+        обновляется. Вместе с ними удаляются брошенные временные файлы.
+        """
+        root = os.path.join(
+            settings.PRIVATE_MEDIA_ROOT, SHOPPING_LIST_EXPORT_DIR
+        )
+        if not os.path.isdir(root):
+            return
+        for directory in iter_directories(root):
+            files = iter_files(directory)
+            while True:
+                batch = list(islice(files, BATCH_SIZE))
+                if not batch:
+                    break
+                self.stats['scanned'] += len(batch)
+                self.delete([
+                    entry for entry in batch
+                    if entry.stat(follow_symlinks=False).st_mtime < deadline
+                ])
+
+    def get_name(self, path):
+        return os.path.relpath(path, settings.MEDIA_ROOT).replace(
+            os.sep, '/'
+        )
+
+    def is_old(self, entry):
+        return entry.stat(follow_symlinks=False).st_mtime < self.deadline
+
+    def delete(self, entries):
+        for entry in entries:
+            self.stats['freed'] += entry.stat(follow_symlinks=False).st_size
+            if self.verbosity > 1:
+                self.stdout.write(self.get_name(entry.path))
+        self.stats['deleted'] += len(entries)
+        if not self.dry_run:
+            list(self.executor.map(
+                remove, (entry.path for entry in entries)
+            ))
@@ -0,0 +1,90 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import EXPORT_CHUNK_SIZE
+from api.exporters import EXPORT_DATASETS, export_records, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузить рецепты или пользователей в NDJSON: по записи в строке '
+        'в порядке id. Прерванную выгрузку можно продолжить параметром '
+        '--after с id последней полной строки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Путь к файлу, "-" - стандартный вывод.'
+        )
+        parser.add_argument(
+            '--dataset',
+            choices=list(EXPORT_DATASETS),
+            default='recipes',
+            help='Что выгружать.'
+        )
+        parser.add_argument(
+            '--after',
+            type=int,
+            default=0,
+            help='Выгружать записи с id больше указанного.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Число записей в одном запросе к базе.'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать выгрузку gzip.'
+        )
+        parser.add_argument(
+            '--append',
+            action='store_true',
+            help='Дописать в конец файла, а не перезаписать его.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля.')
+        self.count = 0
+        self.last_id = options['after']
+        if options['path'] == '-':
+            self.export(sys.stdout.buffer, options)
+            sys.stdout.flush()
+            summary = self.stderr
+        else:
+            try:
+                with open(
+                    options['path'], 'ab' if options['append'] else 'wb'
+                ) as file:
+                    self.export(file, options)
+            except OSError as error:
+                raise CommandError(error)
+            summary = self.stdout
+        summary.write(self.style.SUCCESS(
+            f'Выгрузка завершена: записей - {self.count}, '
+            f'последний id - {self.last_id}.'
+        ))
+
+    def export(self, file, options):
+        for block in iter_ndjson(
+            self.count_records(export_records(
+                options['dataset'],
+                after=options['after'],
+                chunk_size=options['chunk_size'],
+            )),
+            compress=options['gzip'],
+        ):
+            file.write(block)
+
+    def count_records(self, records):
+        for record in records:
+            self.count += 1
+            self.last_id = record['id']
+            yield record
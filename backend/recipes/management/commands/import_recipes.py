@@ -0,0 +1,89 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import IMPORT_BATCH_SIZE, IMPORT_IMAGE_WORKERS
+from api.importers import import_recipes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортировать рецепты из файла NDJSON: по рецепту в формате '
+        'POST /api/recipes/ в строке. Ошибки выводятся в stderr строками '
+        'JSON с номером строки файла'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу NDJSON, "-" - стандартный ввод.'
+        )
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Email автора импортируемых рецептов.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Число рецептов в одной транзакции.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=IMPORT_IMAGE_WORKERS,
+            help='Число потоков для обработки изображений.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            )
+        self.created = self.failed = 0
+        if options['path'] == '-':
+            self.import_file(sys.stdin, author, options)
+        else:
+            try:
+                with open(options['path'], encoding='utf-8') as file:
+                    self.import_file(file, author, options)
+            except OSError as error:
+                raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: создано рецептов - {self.created}, '
+            f'с ошибками - {self.failed}.'
+        ))
+
+    def import_file(self, file, author, options):
+        for result in import_recipes(
+            self.read_rows(file),
+            author,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        ):
+            if 'id' in result:
+                self.created += 1
+            else:
+                self.report(result)
+
+    def read_rows(self, file):
+        """Отдаёт пары (номер строки, рецепт), о неверном JSON сообщает."""
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as error:
+                self.report({
+                    'row': number, 'errors': [f'Неверный JSON - {error}'],
+                })
+
+    def report(self, result):
+        self.failed += 1
+        self.stderr.write(json.dumps(result, ensure_ascii=False))
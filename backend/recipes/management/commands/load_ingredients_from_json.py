@@ -1,29 +1,14 @@
-import json
+from recipes.management.loaders import IngredientLoaderCommand, iter_json_array
 
-from django.core.management.base import BaseCommand
 
-from recipes.models import Ingredient
+class Command(IngredientLoaderCommand):
+    help = 'Загрузить ингредиенты из json-массива объектов'
 
+    file_type = 'json'
 
-class Command(BaseCommand):
-
-    def add_arguments(self, parser):
-        parser.add_argument(
-            'file_path',
-            type=str,
-            help='Путь к csv-файлу.'
-        )
-
-    def handle(self, *args, **options):
-        file_path = options.get('file_path')
-
-        with open(file_path, newline='', encoding='utf-8') as jsonfile:
-            reader = json.load(jsonfile)
-            count = 0
-            for row in reader:
-                Ingredient.objects.create(**row)
-                count += 1
-
-            self.stdout.write(
-                self.style.SUCCESS(f'Всего загружено {count} ингредиентов.')
-            )
+    def read_rows(self, file):
+        for row in iter_json_array(file):
+            try:
+                yield row['name'], row['measurement_unit']
+            except (KeyError, TypeError):
+                self.counts['skipped'] += 1
@@ -0,0 +1,78 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.constants import BATCH_SIZE
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобрать списки покупок по корзинам пользователей '
+        'и сообщить о расхождениях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только сообщить о расхождениях, не изменяя таблицу.'
+        )
+
+    def compare(self, expected, actual):
+        """Сравнивает два упорядоченных потока строк списков покупок."""
+        drift = {'missing': 0, 'extra': 0, 'mismatched': 0}
+        expected_row = next(expected, None)
+        actual_row = next(actual, None)
+        while expected_row is not None or actual_row is not None:
+            if actual_row is None or (
+                expected_row is not None and expected_row[:2] < actual_row[:2]
+            ):
+                drift['missing'] += 1
+                expected_row = next(expected, None)
+            elif expected_row is None or expected_row[:2] > actual_row[:2]:
+                drift['extra'] += 1
+                actual_row = next(actual, None)
+            else:
+                if expected_row[2] != actual_row[2]:
+                    drift['mismatched'] += 1
+                expected_row = next(expected, None)
+                actual_row = next(actual, None)
+        return drift
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = self.compare(
+                ShoppingListItem.objects.aggregate_carts().iterator(
+                    chunk_size=BATCH_SIZE
+                ),
+                ShoppingListItem.objects.order_by(
+                    'user', 'ingredient'
+                ).values_list(
+                    'user', 'ingredient', 'total_amount'
+                ).iterator(chunk_size=BATCH_SIZE),
+            )
+            self.stdout.write(
+                'Расхождения: нет в таблице - {missing}, лишних - {extra}, '
+                'неверное количество - {mismatched}.'.format(**drift)
+            )
+            if options['dry_run'] or not any(drift.values()):
+                return
+            ShoppingListItem.objects.all().delete()
+            rows = ShoppingListItem.objects.aggregate_carts().iterator(
+                chunk_size=BATCH_SIZE
+            )
+            while True:
+                batch = list(islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                ShoppingListItem.objects.bulk_create(
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount,
+                    )
+                    for user_id, ingredient_id, total_amount in batch
+                )
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны.'))
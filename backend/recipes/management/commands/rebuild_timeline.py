@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.constants import BATCH_SIZE, FEED_FANOUT_MAX_FOLLOWERS
+from recipes.models import Recipe, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобрать ленты подписок. Нужно, например, после того как '
+        'популярный автор потерял подписчиков: его прежние рецепты '
+        'в ленты не раскладывались'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            deleted, _ = TimelineEntry.objects.all().delete()
+            TimelineEntry.objects.add_entries(
+                Recipe.objects.filter(
+                    author__followers__isnull=False,
+                    author__followers_count__lt=FEED_FANOUT_MAX_FOLLOWERS,
+                ).values_list(
+                    'author__followers__user', 'pk', 'created'
+                ).iterator(chunk_size=BATCH_SIZE)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны: удалено записей - {deleted}, '
+            f'добавлено - {TimelineEntry.objects.count()}.'
+        ))
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Recipe.is_favorited.through, 'recipe'),
+    (Recipe, 'in_carts_count', Recipe.is_in_shopping_cart.through, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'following'),
+)
+
+
+def count_rows(model, field_name):
+    """Подзапрос числа строк model, ссылающихся на объект полем field_name."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field_name: OuterRef('pk')}
+            ).order_by().values(field_name).annotate(
+                rows_count=Count('pk')
+            ).values('rows_count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать счётчики избранного, списков покупок, рецептов '
+        'и подписчиков и сообщить о расхождениях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только сообщить о расхождениях, не изменяя счётчики.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, counter, source, field_name in COUNTERS:
+                drifted = model.objects.annotate(
+                    expected=count_rows(source, field_name)
+                ).exclude(
+                    **{counter: F('expected')}
+                ).values_list('pk', flat=True)
+                drift = drifted.count()
+                self.stdout.write(
+                    f'{model._meta.model_name}.{counter}: '
+                    f'расхождений - {drift}.'
+                )
+                if options['dry_run'] or not drift:
+                    continue
+                model.objects.filter(pk__in=list(drifted)).update(
+                    **{counter: count_rows(source, field_name)}
+                )
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
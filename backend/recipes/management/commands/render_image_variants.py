@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils.text import capfirst
+
+from api.renditions import render_now
+from recipes.constants import BATCH_SIZE
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создать уменьшенные копии изображений рецептов и аватаров, '
+        'у которых их ещё нет'
+    )
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Recipe, 'image'), (User, 'avatar')):
+            objects = model.objects.filter(
+                **{f'{field_name}_variants': {}}
+            ).exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).only('pk', field_name).order_by('pk')
+            rendered = failed = 0
+            for instance in objects.iterator(chunk_size=BATCH_SIZE):
+                try:
+                    render_now(instance, field_name)
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(
+                        f'{getattr(instance, field_name).name}: {error}'
+                    )
+                else:
+                    rendered += 1
+            self.stdout.write(
+                f'{capfirst(model._meta.verbose_name_plural)}: '
+                f'создано копий - {rendered}, ошибок - {failed}.'
+            )
@@ -0,0 +1,153 @@
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_generation
+from recipes.constants import (BATCH_SIZE, MAX_LENGTH_INGREDIENT_NAME,
+                               MAX_LENGTH_INGREDIENT_UNIT)
+from recipes.models import Ingredient
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def normalize(value):
+    """Убирает пробелы по краям и повторяющиеся пробелы внутри строки."""
+    return ' '.join(str(value).split())
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """
+    Построчно разбирает json-массив объектов из файла, не загружая
+    файл в память целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    eof = False
+    while True:
+        while position < len(buffer) and (
+            buffer[position].isspace() or (opened and buffer[position] == ',')
+        ):
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError('Неожиданный конец json-файла.')
+            buffer = file.read(chunk_size)
+            position = 0
+            eof = not buffer
+            continue
+        if not opened:
+            if buffer[position] != '[':
+                raise ValueError('Файл должен содержать json-массив.')
+            opened = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+class IngredientLoaderCommand(BaseCommand):
+    """
+    Базовая команда загрузки ингредиентов: файл читается потоком,
+    строки записываются пакетами через upsert в одной транзакции.
+    """
+
+    file_type = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file_path',
+            type=str,
+            help=f'Путь к {self.file_type}-файлу.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном запросе.'
+        )
+
+    def read_rows(self, file):
+        """Возвращает пары (название, единица измерения) из файла."""
+        raise NotImplementedError
+
+    def clean_rows(self, rows):
+        for name, measurement_unit in rows:
+            name = normalize(name)
+            measurement_unit = normalize(measurement_unit)
+            if (
+                not name or not measurement_unit
+                or len(name) > MAX_LENGTH_INGREDIENT_NAME
+                or len(measurement_unit) > MAX_LENGTH_INGREDIENT_UNIT
+            ):
+                self.counts['skipped'] += 1
+                continue
+            yield name, measurement_unit
+
+    def save_batch(self, batch):
+        ingredients = {}
+        for name, measurement_unit in batch:
+            if name in ingredients:
+                self.counts['skipped'] += 1
+            ingredients[name] = measurement_unit
+        existing = dict(
+            Ingredient.objects.filter(name__in=ingredients).values_list(
+                'name', 'measurement_unit'
+            )
+        )
+        changed = []
+        for name, measurement_unit in ingredients.items():
+            if name not in existing:
+                self.counts['inserted'] += 1
+            elif existing[name] != measurement_unit:
+                self.counts['updated'] += 1
+            else:
+                self.counts['skipped'] += 1
+                continue
+            changed.append(
+                Ingredient(name=name, measurement_unit=measurement_unit)
+            )
+        Ingredient.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['measurement_unit'],
+        )
+
+    def handle(self, *args, **options):
+        self.counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        started = time.perf_counter()
+        with open(options['file_path'], newline='', encoding='utf-8') as file:
+            rows = self.clean_rows(self.read_rows(file))
+            with transaction.atomic():
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    self.save_batch(batch)
+        bump_generation(Ingredient._meta.model_name)
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            'Добавлено: {inserted}, обновлено: {updated}, '
+            'пропущено: {skipped}.'.format(**self.counts)
+        ))
+        self.stdout.write(
+            f'Обработано {total} строк за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} строк/с).'
+        )
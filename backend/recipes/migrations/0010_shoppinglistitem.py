@@ -0,0 +1,80 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = RecipeIngredient.objects.filter(
+        recipe__is_in_shopping_cart__isnull=False
+    ).values('recipe__is_in_shopping_cart', 'ingredient').annotate(
+        total_amount=Sum('amount')
+    ).values_list('recipe__is_in_shopping_cart', 'ingredient', 'total_amount')
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount,
+            )
+            for user_id, ingredient_id, total_amount in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_alter_recipe_options_recipe_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(verbose_name='общее количество')),
+            ],
+            options={
+                'verbose_name': 'ингредиент в списке покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeingredient',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subscription',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredients_in_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('following', 'user'), name='unique_subscription'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='ингредиент'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
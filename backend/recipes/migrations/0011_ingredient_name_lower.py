@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_name_lower(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    ingredients = []
+    for ingredient in Ingredient.objects.only('name').iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        ingredient.name_lower = ingredient.name.lower()
+        ingredients.append(ingredient)
+        if len(ingredients) == BATCH_SIZE:
+            Ingredient.objects.bulk_update(ingredients, ['name_lower'])
+            ingredients = []
+    Ingredient.objects.bulk_update(ingredients, ['name_lower'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_lower',
+            field=models.CharField(default='', editable=False, max_length=128, verbose_name='название в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_name_lower, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name_lower'], name='ingredient_name_lower_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
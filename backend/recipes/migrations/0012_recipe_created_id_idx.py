@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_name_lower'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created', '-id'], name='recipe_created_id_idx'),
+        ),
+    ]
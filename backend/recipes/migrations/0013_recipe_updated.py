@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата изменения'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(queryset, field_name):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field_name: OuterRef('pk')}).order_by().values(
+                field_name
+            ).annotate(rows_count=Count('pk')).values('rows_count')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('recipes', 'Subscription')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(
+        favorites_count=count_rows(
+            Recipe.is_favorited.through.objects.all(), 'recipe'
+        ),
+        in_carts_count=count_rows(
+            Recipe.is_in_shopping_cart.through.objects.all(), 'recipe'
+        ),
+    )
+    User.objects.update(
+        recipes_count=count_rows(Recipe.objects.all(), 'author'),
+        followers_count=count_rows(Subscription.objects.all(), 'following'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_updated'),
+        ('users', '0010_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:34
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fill_stored_files(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    StoredFile = apps.get_model('recipes', 'StoredFile')
+    User = apps.get_model('users', 'User')
+    references = Counter(
+        Recipe.objects.exclude(image='').values_list('image', flat=True)
+    )
+    references.update(
+        User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        .values_list('avatar', flat=True)
+    )
+    StoredFile.objects.bulk_create(
+        (
+            StoredFile(name=name, references=count)
+            for name, count in references.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_image_variants'),
+        ('users', '0011_user_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='количество ссылок')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+            ],
+            options={
+                'verbose_name': 'файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.RunPython(fill_stored_files, migrations.RunPython.noop),
+    ]
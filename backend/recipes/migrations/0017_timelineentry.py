@@ -0,0 +1,52 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.constants import FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fill_timelines(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    rows = Recipe.objects.filter(
+        author__followers__isnull=False,
+        author__followers_count__lt=FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('author__followers__user', 'pk', 'created')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, recipe_id=recipe_id, created=created)
+            for user_id, recipe_id, created in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0016_storedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='дата публикации')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+                'indexes': [models.Index(fields=['user', '-created'], name='timeline_user_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,17 @@
+from collections import Counter, defaultdict
+from itertools import islice
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
 
-from .constants import (MAX_LENGTH_INGREDIENT_NAME, MAX_LENGTH_INGREDIENT_UNIT,
-                        MAX_LENGTH_RECIPE, MAX_LENGTH_TAG)
+from .constants import (BATCH_SIZE, FEED_FANOUT_MAX_FOLLOWERS,
+                        MAX_LENGTH_FILE_NAME, MAX_LENGTH_INGREDIENT_NAME,
+                        MAX_LENGTH_INGREDIENT_UNIT, MAX_LENGTH_RECIPE,
+                        MAX_LENGTH_TAG)
+from users.models import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -26,6 +34,16 @@ class Tag(models.Model):
         return self.name
 
 
+class IngredientManager(models.Manager):
+    """Заполняет name_lower и у объектов, создаваемых bulk_create."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for ingredient in objs:
+            ingredient.name_lower = ingredient.name.lower()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Ingredient(models.Model):
     """Модель описывающая ингредиенты рецептов."""
 
@@ -34,20 +52,45 @@ class Ingredient(models.Model):
         unique=True,
         verbose_name='Название ингредиента',
     )
+    # Название в нижнем регистре для поиска: LOWER() в SQLite не
+    # работает с кириллицей, поэтому регистр приводится в Python.
+    name_lower = models.CharField(
+        max_length=MAX_LENGTH_INGREDIENT_NAME,
+        editable=False,
+        verbose_name='название в нижнем регистре',
+    )
     measurement_unit = models.CharField(
         max_length=MAX_LENGTH_INGREDIENT_UNIT,
         verbose_name='Единица измерения'
     )
 
+    objects = IngredientManager()
+
     class Meta:
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            # Класс операторов нужен PostgreSQL для LIKE 'префикс%'
+            # при любой локали базы, другие СУБД его не используют.
+            models.Index(
+                fields=['name_lower'],
+                name='ingredient_name_lower_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_lower = self.name.lower()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_lower'}
+        super().save(*args, **kwargs)
+
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель описывающая рецепт."""
 
     tags = models.ManyToManyField(
@@ -73,6 +116,12 @@ class Recipe(models.Model):
         help_text='Загрузите изображение блюда',
         upload_to='recipes/',
     )
+    image_variants = models.JSONField(
+        verbose_name='уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='описание',
         help_text='Заполните описание приготовления блюда'
@@ -97,11 +146,31 @@ class Recipe(models.Model):
     created = models.DateTimeField(
         verbose_name='дата создания', auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='дата изменения', auto_now=True, db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='количество добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='количество добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=('-created', '-id'), name='recipe_created_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -156,3 +225,275 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user} - {self.following}'
+
+
+class ShoppingListItemManager(models.Manager):
+    """Поддерживает суммы ингредиентов в списках покупок."""
+
+    def aggregate_carts(self):
+        """
+        Считает списки покупок заново по рецептам в корзинах.
+
+        Возвращает кортежи (id пользователя, id ингредиента, количество),
+        упорядоченные по пользователю и ингредиенту.
+        """
+        return RecipeIngredient.objects.filter(
+            recipe__is_in_shopping_cart__isnull=False
+        ).values('recipe__is_in_shopping_cart', 'ingredient').annotate(
+            total_amount=Sum('amount')
+        ).order_by('recipe__is_in_shopping_cart', 'ingredient').values_list(
+            'recipe__is_in_shopping_cart', 'ingredient', 'total_amount'
+        )
+
+    def apply_amounts(self, user_ids, amounts):
+        """
+        Прибавляет к спискам покупок пользователей количества ингредиентов.
+
+        amounts - словарь {id ингредиента: количество}, отрицательное
+        количество вычитается. Строки с нулевой суммой удаляются.
+        """
+        user_ids = list(user_ids)
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                pk__in=user_ids
+            ).values_list('pk', flat=True))
+            items = self.filter(user__in=user_ids, ingredient__in=amounts)
+            existing = set(items.values_list('user_id', 'ingredient_id'))
+            if existing:
+                items.update(total_amount=Greatest(
+                    F('total_amount') + Case(
+                        *(When(ingredient=ingredient_id, then=Value(amount))
+                          for ingredient_id, amount in amounts.items())
+                    ),
+                    0,
+                ))
+            self.bulk_create(
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=amount,
+                )
+                for user_id in user_ids
+                for ingredient_id, amount in amounts.items()
+                if amount > 0 and (user_id, ingredient_id) not in existing
+            )
+            self.filter(user__in=user_ids, total_amount=0).delete()
+
+    def remove_recipe_from_all(self, recipe):
+        """Вычитает рецепт из списков покупок всех пользователей."""
+        self.apply_amounts(
+            recipe.is_in_shopping_cart.values_list('pk', flat=True),
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount in recipe_amounts(recipe).items()
+            },
+        )
+
+
+def recipe_amounts(recipe):
+    """Возвращает словарь {id ингредиента: количество} рецепта."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+def recipes_amounts(recipe_ids):
+    """Возвращает словарь {id ингредиента: общее количество} рецептов."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe__in=recipe_ids).order_by()
+        .values('ingredient_id').annotate(total=Sum('amount'))
+        .values_list('ingredient_id', 'total')
+    )
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, verbose_name='ингредиент', on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='общее количество'
+    )
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'ingredient'],
+            name='unique_shopping_list_item',
+        )]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}'
+
+
+class StoredFileManager(models.Manager):
+    """Ведёт число ссылок на файлы в хранилище."""
+
+    def acquire(self, name):
+        if not name:
+            return
+        stored_file, created = self.get_or_create(
+            name=name, defaults={'references': 1}
+        )
+        if not created:
+            self.filter(pk=stored_file.pk).update(
+                references=F('references') + 1
+            )
+
+    def acquire_many(self, names):
+        """Как acquire для списка имён, но без запросов на каждое имя."""
+        counts = Counter(name for name in names if name)
+        self.bulk_create(
+            (self.model(name=name) for name in counts), ignore_conflicts=True
+        )
+        by_count = defaultdict(list)
+        for name, count in counts.items():
+            by_count[count].append(name)
+        for count, group in by_count.items():
+            self.filter(name__in=group).update(
+                references=F('references') + count
+            )
+
+    def release(self, name):
+        if name:
+            self.filter(name=name).update(
+                references=Greatest(F('references') - 1, 0)
+            )
+
+
+class StoredFile(models.Model):
+    """
+    Файл в хранилище с числом ссылающихся на него объектов. Файлы без
+    ссылок может удалить сборщик мусора.
+    """
+
+    name = models.CharField(
+        max_length=MAX_LENGTH_FILE_NAME, unique=True, verbose_name='имя файла'
+    )
+    references = models.PositiveIntegerField(
+        verbose_name='количество ссылок', default=0
+    )
+    created = models.DateTimeField(
+        verbose_name='дата создания', auto_now_add=True
+    )
+
+    objects = StoredFileManager()
+
+    class Meta:
+        verbose_name = 'файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
+
+
+def is_popular_author(author_id):
+    """
+    Рецепты популярных авторов не раскладываются по лентам подписчиков,
+    а добавляются в ленту при чтении.
+    """
+    return User.objects.filter(
+        pk=author_id, followers_count__gte=FEED_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+class TimelineEntryManager(models.Manager):
+    """Раскладывает рецепты авторов по лентам их подписчиков."""
+
+    def add_entries(self, rows):
+        """Добавляет записи пачками, rows - (пользователь, рецепт, дата)."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            self.bulk_create(
+                (
+                    self.model(user_id=user_id, recipe_id=recipe_id,
+                               created=created)
+                    for user_id, recipe_id, created in batch
+                ),
+                ignore_conflicts=True,
+            )
+
+    def fan_out(self, recipe):
+        """Добавляет новый рецепт в ленты подписчиков автора."""
+        if is_popular_author(recipe.author_id):
+            return
+        self.add_entries(
+            (user_id, recipe.pk, recipe.created)
+            for user_id in Subscription.objects.filter(
+                following=recipe.author_id
+            ).values_list('user_id', flat=True).iterator(
+                chunk_size=BATCH_SIZE
+            )
+        )
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту нового подписчика рецепты автора."""
+        if is_popular_author(author_id):
+            return
+        self.add_entries(
+            (user_id, recipe_id, created)
+            for recipe_id, created in Recipe.objects.filter(
+                author=author_id
+            ).values_list('pk', 'created').iterator(chunk_size=BATCH_SIZE)
+        )
+
+    def prune(self, user_id, author_id):
+        """Убирает из ленты рецепты автора после отписки."""
+        self.filter(user=user_id, recipe__author=author_id).delete()
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='пользователь',
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='рецепт',
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(verbose_name='дата публикации')
+
+    objects = TimelineEntryManager()
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'],
+            name='unique_timeline_entry',
+        )]
+        indexes = [
+            models.Index(
+                fields=('user', '-created'), name='timeline_user_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
@@ -10,7 +10,9 @@ class UserAdmin(admin.ModelAdmin):
     """Администрирование пользователей."""
 
     list_display = (
-        'first_name', 'last_name', 'username', 'email', 'password', 'avatar'
+        'first_name', 'last_name', 'username', 'email', 'password', 'avatar',
+        'recipes_count', 'followers_count',
     )
+    readonly_fields = ('recipes_count', 'followers_count')
     search_fields = ('email', 'first_name')
     list_display_links = ('first_name', 'last_name', 'username', 'email')
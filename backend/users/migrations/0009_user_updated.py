@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_alter_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Меняется также при изменении избранного, списка покупок и подписок пользователя', verbose_name='дата изменения'),
+        ),
+    ]
@@ -5,7 +5,33 @@ from django.utils.translation import gettext_lazy as _
 from .constants import MAX_LENGTH_CHARFIELD, MAX_LENGTH_EMAIL
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Не даёт обычному save() перезаписать счётчики, которые сигналы
+    меняют запросами UPDATE с F(): иначе сохранение объекта,
+    загруженного до такого UPDATE, вернуло бы прежнее значение.
+    Явно переданный update_fields сохраняет счётчики как есть.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """Модель пользователя с дополнительным полем avatar."""
 
     email = models.EmailField(
@@ -23,6 +49,27 @@ class User(AbstractUser):
         default=None,
         null=True
     )
+    avatar_variants = models.JSONField(
+        verbose_name='уменьшенные копии аватара',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    updated = models.DateTimeField(
+        verbose_name='дата изменения',
+        help_text='Меняется также при изменении избранного, '
+                  'списка покупок и подписок пользователя',
+        auto_now=True,
+        db_index=True,
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='количество подписчиков', default=0, editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []